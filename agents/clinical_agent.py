@@ -6,18 +6,262 @@ Can hand off to other agents when needed (e.g., pricing, benefits, pharmacy).
 Now uses OpenAI Chat Completions API with streaming instead of Assistants API.
 """
 
-import json
+import logging
 import time
+from functools import lru_cache
 from typing import Dict, Any, Optional, List
 from core.agent_coordinator import BaseAgent, AgentType
-from openai import OpenAI
+from openai import AsyncOpenAI
+from core.serialization import dumps
 from core.shared_prompts import get_shared_context_awareness, get_shared_handoff_rules
 
+logger = logging.getLogger(__name__)
+
+# Mock payloads, built once at import; handlers add only the per-call fields
+_INTERACTION_FINDING = {
+    "severity": "Moderate",
+    "mechanism": "Both medications can lower blood pressure",
+    "clinical_effect": "Increased risk of hypotension",
+    "recommendation": "Monitor blood pressure closely. Consider dose adjustment.",
+    "documentation": "Well-documented"
+}
+
+_NO_INTERACTIONS = {
+    "interactions_found": [],
+    "total_interactions": 0,
+    "message": "No interactions found with single drug"
+}
+
+_THERAPEUTIC_ALTERNATIVES = {
+    "alternatives": [
+        {
+            "drug_name": "Lisinopril",
+            "drug_class": "ACE Inhibitor",
+            "mechanism": "ACE inhibition",
+            "efficacy": "Similar efficacy for hypertension",
+            "safety_profile": "Generally well tolerated",
+            "cost_category": "Generic - Low cost"
+        },
+        {
+            "drug_name": "Losartan",
+            "drug_class": "ARB",
+            "mechanism": "Angiotensin receptor blocking",
+            "efficacy": "Equivalent efficacy",
+            "safety_profile": "Lower cough incidence than ACE inhibitors",
+            "cost_category": "Generic - Low cost"
+        }
+    ]
+}
+
+_CLINICAL_CRITERIA_RESULT = {
+    "criteria_met": True,
+    "clinical_requirements": [
+        {
+            "requirement": "Appropriate diagnosis",
+            "status": "Met",
+            "evidence": "ICD-10 code I10 - Essential hypertension"
+        },
+        {
+            "requirement": "First-line therapy trial",
+            "status": "Met",
+            "evidence": "Previous ACE inhibitor trial documented"
+        },
+        {
+            "requirement": "Age appropriateness",
+            "status": "Met",
+            "evidence": "Patient age 39 - within approved range"
+        }
+    ],
+    "approval_recommendation": "Approve - All clinical criteria met"
+}
+
+_ALLERGY_CHECK_RESULT = {
+    "allergy_found": False,
+    "member_allergies": [
+        {
+            "allergen": "Penicillin",
+            "reaction": "Rash",
+            "severity": "Mild",
+            "date_reported": "2020-03-15"
+        }
+    ],
+    "cross_sensitivity_check": {
+        "potential_cross_reactions": [],
+        "safe_to_use": True
+    }
+}
+
+_DOSING_GUIDANCE = {
+    "recommended_dosing": {
+        "starting_dose": "5mg once daily",
+        "maximum_dose": "40mg once daily",
+        "titration_schedule": "Increase by 5-10mg every 2-4 weeks as tolerated",
+        "special_considerations": [
+            "Take with or without food",
+            "Monitor blood pressure and kidney function",
+            "Reduce dose in elderly patients"
+        ]
+    },
+    "age_specific_notes": "Adult dosing appropriate for age 39",
+    "monitoring_parameters": [
+        "Blood pressure",
+        "Serum creatinine",
+        "Serum potassium"
+    ]
+}
+
+_SAFETY_ALERTS = {
+    "active_alerts": [
+        {
+            "alert_type": "safety_communication",
+            "date_issued": "2024-08-15",
+            "title": "Risk of angioedema with ACE inhibitors",
+            "summary": "Rare but serious risk of angioedema, particularly in first month of therapy",
+            "action_required": "Monitor patients for signs of angioedema, especially during initiation",
+            "severity": "Important"
+        }
+    ],
+    "recalls": [],
+    "boxed_warnings": []
+}
+
+@lru_cache(maxsize=None)
+def _clinical_prompt() -> str:
+    """Clinical agent system prompt, assembled once per process"""
+    base_prompt = """
+You are a specialized clinical pharmacist expert for a healthcare system.
+Your expertise is in drug interactions, therapeutic alternatives, clinical criteria, and medication safety.
+Provide clear, evidence-based clinical information in concise responses.
+Use the 'request_handoff' function only when services outside your clinical domain are needed.
+"""
+    context_awareness = get_shared_context_awareness()
+    handoff_rules = get_shared_handoff_rules(AgentType.CLINICAL)
+    clarification_rules = """
+CLARIFICATION_RULES:
+- After providing clinical recommendations, answer follow-up questions directly, such as 'What does that interaction imply?' or 'How serious is this?'
+- Avoid handoffs for clarifications within the clinical scope.
+- Only hand off pricing, coverage, prescription management, or authentication questions outside the clinical domain.
+"""
+    return base_prompt + context_awareness + handoff_rules + clarification_rules
+
+# Clinical tool schemas, shared by every instance; the handoff tool is added per mode
+_CLINICAL_TOOLS: tuple = (
+    {
+        "type": "function",
+        "function": {
+            "name": "check_drug_interactions",
+            "description": "Check for drug-drug interactions",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "drug_list": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "List of drugs to check for interactions"
+                    },
+                    "member_id": {"type": "string", "description": "Member ID (optional)"}
+                },
+                "required": ["drug_list"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "find_therapeutic_alternatives",
+            "description": "Find therapeutic alternatives for a drug",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "drug_name": {"type": "string", "description": "Drug name to find alternatives for"},
+                    "indication": {"type": "string", "description": "Medical condition/indication"},
+                    "contraindications": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Known allergies or contraindications"
+                    }
+                },
+                "required": ["drug_name"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "check_clinical_criteria",
+            "description": "Check clinical criteria for drug approval",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "drug_name": {"type": "string", "description": "Drug name"},
+                    "indication": {"type": "string", "description": "Medical indication"},
+                    "member_id": {"type": "string", "description": "Member ID"},
+                    "age": {"type": "integer", "description": "Patient age (optional)"}
+                },
+                "required": ["drug_name", "indication", "member_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "check_allergies",
+            "description": "Check for drug allergies and cross-sensitivities",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "member_id": {"type": "string", "description": "Member ID"},
+                    "drug_name": {"type": "string", "description": "Drug to check"}
+                },
+                "required": ["member_id", "drug_name"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_dosing_guidance",
+            "description": "Get dosing recommendations based on patient factors",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "drug_name": {"type": "string", "description": "Drug name"},
+                    "indication": {"type": "string", "description": "Medical indication"},
+                    "age": {"type": "integer", "description": "Patient age"},
+                    "weight": {"type": "number", "description": "Patient weight in kg (optional)"},
+                    "renal_function": {"type": "string", "description": "Renal function status (optional)"}
+                },
+                "required": ["drug_name", "indication", "age"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "safety_alert_check",
+            "description": "Check for FDA safety alerts and warnings",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "drug_name": {"type": "string", "description": "Drug name"},
+                    "alert_type": {
+                        "type": "string", 
+                        "enum": ["boxed_warning", "safety_communication", "recall"],
+                        "description": "Type of safety alert (optional)"
+                    }
+                },
+                "required": ["drug_name"]                    }
+        }
+    }
+)
+
 
 class ClinicalAgent(BaseAgent):
     """Specialized agent for clinical and medical guidance"""
     
-    def __init__(self, client: OpenAI, model: str = "gpt-4.1"):
+    __slots__ = ()
+    
+    def __init__(self, client: AsyncOpenAI, model: str = "gpt-4.1"):
         super().__init__(client, AgentType.CLINICAL, model=model)
         
         # Set agent-specific properties
@@ -30,336 +274,136 @@ class ClinicalAgent(BaseAgent):
         
     def get_system_prompt(self) -> str:
         """Get the system prompt for the clinical agent"""
-        base_prompt = """
-You are a specialized clinical pharmacist expert for a healthcare system.
-Your expertise is in drug interactions, therapeutic alternatives, clinical criteria, and medication safety.
-Provide clear, evidence-based clinical information in concise responses.
-Use the 'request_handoff' function only when services outside your clinical domain are needed.
-"""
-        context_awareness = get_shared_context_awareness()
-        handoff_rules = get_shared_handoff_rules(AgentType.CLINICAL)
-        clarification_rules = """
-CLARIFICATION_RULES:
-- After providing clinical recommendations, answer follow-up questions directly, such as 'What does that interaction imply?' or 'How serious is this?'
-- Avoid handoffs for clarifications within the clinical scope.
-- Only hand off pricing, coverage, prescription management, or authentication questions outside the clinical domain.
-"""
-        return base_prompt + context_awareness + handoff_rules + clarification_rules
+        return _clinical_prompt()
         
     def get_tools(self) -> List[Dict[str, Any]]:
         """Get the tools configuration for the clinical agent"""
-        base_tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "check_drug_interactions",
-                    "description": "Check for drug-drug interactions",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "drug_list": {
-                                "type": "array",
-                                "items": {"type": "string"},
-                                "description": "List of drugs to check for interactions"
-                            },
-                            "member_id": {"type": "string", "description": "Member ID (optional)"}
-                        },
-                        "required": ["drug_list"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "find_therapeutic_alternatives",
-                    "description": "Find therapeutic alternatives for a drug",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "drug_name": {"type": "string", "description": "Drug name to find alternatives for"},
-                            "indication": {"type": "string", "description": "Medical condition/indication"},
-                            "contraindications": {
-                                "type": "array",
-                                "items": {"type": "string"},
-                                "description": "Known allergies or contraindications"
-                            }
-                        },
-                        "required": ["drug_name"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "check_clinical_criteria",
-                    "description": "Check clinical criteria for drug approval",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "drug_name": {"type": "string", "description": "Drug name"},
-                            "indication": {"type": "string", "description": "Medical indication"},
-                            "member_id": {"type": "string", "description": "Member ID"},
-                            "age": {"type": "integer", "description": "Patient age (optional)"}
-                        },
-                        "required": ["drug_name", "indication", "member_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "check_allergies",
-                    "description": "Check for drug allergies and cross-sensitivities",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "member_id": {"type": "string", "description": "Member ID"},
-                            "drug_name": {"type": "string", "description": "Drug to check"}
-                        },
-                        "required": ["member_id", "drug_name"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_dosing_guidance",
-                    "description": "Get dosing recommendations based on patient factors",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "drug_name": {"type": "string", "description": "Drug name"},
-                            "indication": {"type": "string", "description": "Medical indication"},
-                            "age": {"type": "integer", "description": "Patient age"},
-                            "weight": {"type": "number", "description": "Patient weight in kg (optional)"},
-                            "renal_function": {"type": "string", "description": "Renal function status (optional)"}
-                        },
-                        "required": ["drug_name", "indication", "age"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "safety_alert_check",
-                    "description": "Check for FDA safety alerts and warnings",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "drug_name": {"type": "string", "description": "Drug name"},
-                            "alert_type": {
-                                "type": "string", 
-                                "enum": ["boxed_warning", "safety_communication", "recall"],
-                                "description": "Type of safety alert (optional)"
-                            }
-                        },
-                        "required": ["drug_name"]                    }
-                }
+        return [*_CLINICAL_TOOLS, self.get_handoff_tool()]
+    
+    def _check_drug_interactions(self, function_args: Dict[str, Any]) -> str:
+        drug_list = function_args.get("drug_list", [])
+        
+        logger.debug("⚠️ Checking interactions for drugs: %s", ', '.join(drug_list))
+        
+        # Mock interaction checking
+        if len(drug_list) >= 2:
+            mock_result = {
+                "drugs_checked": drug_list,
+                "interactions_found": [
+                    {"drug_a": drug_list[0], "drug_b": drug_list[1], **_INTERACTION_FINDING}
+                ],
+                "total_interactions": 1
             }
-        ]
+        else:
+            mock_result = {"drugs_checked": drug_list, **_NO_INTERACTIONS}
+        
+        logger.debug("⚠️ Found %s interaction(s)", mock_result['total_interactions'])
+        return dumps(mock_result)
+    
+    def _find_therapeutic_alternatives(self, function_args: Dict[str, Any]) -> str:
+        drug_name = function_args.get("drug_name", "")
+        indication = function_args.get("indication", "")
+        contraindications = function_args.get("contraindications", [])
+        
+        logger.debug("🔄 Finding alternatives for %s", drug_name)
+        
+        mock_result = {
+            "original_drug": drug_name,
+            "indication": indication,
+            "contraindications_considered": contraindications,
+            **_THERAPEUTIC_ALTERNATIVES
+        }
+        
+        logger.debug("🔄 Found %s alternative(s)", len(mock_result['alternatives']))
+        return dumps(mock_result)
+    
+    def _check_clinical_criteria(self, function_args: Dict[str, Any]) -> str:
+        drug_name = function_args.get("drug_name", "")
+        indication = function_args.get("indication", "")
+        member_id = function_args.get("member_id", "")
+        
+        logger.debug("📋 Checking clinical criteria for %s", drug_name)
+        
+        mock_result = {
+            "drug_name": drug_name,
+            "indication": indication,
+            "member_id": member_id,
+            **_CLINICAL_CRITERIA_RESULT
+        }
         
-        # Add the handoff tool from base class
-        handoff_tool = self.get_handoff_tool()
-        if handoff_tool:
-            base_tools.append(handoff_tool)
-            
-        return base_tools
+        logger.debug("✅ Clinical criteria: %s", mock_result['approval_recommendation'])
+        return dumps(mock_result)
+    
+    def _check_allergies(self, function_args: Dict[str, Any]) -> str:
+        member_id = function_args.get("member_id", "")
+        drug_name = function_args.get("drug_name", "")
+        
+        logger.debug("🚨 Checking allergies for %s", drug_name)
+        
+        mock_result = {
+            "member_id": member_id,
+            "drug_checked": drug_name,
+            **_ALLERGY_CHECK_RESULT
+        }
+        
+        status = "Safe" if mock_result["cross_sensitivity_check"]["safe_to_use"] else "Caution"
+        logger.debug("🚨 Allergy check: %s", status)
+        return dumps(mock_result)
+    
+    def _get_dosing_guidance(self, function_args: Dict[str, Any]) -> str:
+        drug_name = function_args.get("drug_name", "")
+        indication = function_args.get("indication", "")
+        age = function_args.get("age", 0)
+        
+        logger.debug("💊 Getting dosing guidance for %s", drug_name)
+        
+        mock_result = {
+            "drug_name": drug_name,
+            "indication": indication,
+            "patient_age": age,
+            **_DOSING_GUIDANCE
+        }
+        
+        logger.debug("💊 Dosing: %s", mock_result['recommended_dosing']['starting_dose'])
+        return dumps(mock_result)
+    
+    def _safety_alert_check(self, function_args: Dict[str, Any]) -> str:
+        drug_name = function_args.get("drug_name", "")
+        alert_type = function_args.get("alert_type")
+        
+        logger.debug("⚠️ Checking safety alerts for %s", drug_name)
+        
+        mock_result = {
+            "drug_name": drug_name,
+            "alert_type_checked": alert_type or "all",
+            **_SAFETY_ALERTS
+        }
+        
+        logger.debug("⚠️ Found %s active alert(s)", len(mock_result['active_alerts']))
+        return dumps(mock_result)
+    
+    # Tool name -> handler, built once with the class
+    _TOOL_HANDLERS = {
+        "check_drug_interactions": _check_drug_interactions,
+        "find_therapeutic_alternatives": _find_therapeutic_alternatives,
+        "check_clinical_criteria": _check_clinical_criteria,
+        "check_allergies": _check_allergies,
+        "get_dosing_guidance": _get_dosing_guidance,
+        "safety_alert_check": _safety_alert_check,
+    }
+    
+    async def handle_tool_call_async(self, function_name: str, function_args: Dict[str, Any]) -> str:
+        """Clinical tools return canned payloads, so run them on the event loop without a worker-thread hop"""
+        return self.handle_tool_call(function_name, function_args)
     
     def handle_tool_call(self, function_name: str, function_args: Dict[str, Any]) -> str:
         """Handle tool calls with console output"""
+        handler = self._TOOL_HANDLERS.get(function_name)
+        if handler is None:
+            return dumps({"error": f"Unknown function: {function_name}"})
         try:
-            if function_name == "check_drug_interactions":
-                drug_list = function_args.get("drug_list", [])
-                
-                print(f"⚠️ Checking interactions for drugs: {', '.join(drug_list)}")
-                
-                # Mock interaction checking
-                if len(drug_list) >= 2:
-                    mock_result = {
-                        "drugs_checked": drug_list,
-                        "interactions_found": [
-                            {
-                                "drug_a": drug_list[0],
-                                "drug_b": drug_list[1] if len(drug_list) > 1 else drug_list[0],
-                                "severity": "Moderate",
-                                "mechanism": "Both medications can lower blood pressure",
-                                "clinical_effect": "Increased risk of hypotension",
-                                "recommendation": "Monitor blood pressure closely. Consider dose adjustment.",
-                                "documentation": "Well-documented"
-                            }
-                        ],
-                        "total_interactions": 1
-                    }
-                else:
-                    mock_result = {
-                        "drugs_checked": drug_list,
-                        "interactions_found": [],
-                        "total_interactions": 0,
-                        "message": "No interactions found with single drug"
-                    }
-                
-                print(f"⚠️ Found {mock_result['total_interactions']} interaction(s)")
-                return json.dumps(mock_result)
-                
-            elif function_name == "find_therapeutic_alternatives":
-                drug_name = function_args.get("drug_name", "")
-                indication = function_args.get("indication", "")
-                contraindications = function_args.get("contraindications", [])
-                
-                print(f"🔄 Finding alternatives for {drug_name}")
-                
-                mock_result = {
-                    "original_drug": drug_name,
-                    "indication": indication,
-                    "alternatives": [
-                        {
-                            "drug_name": "Lisinopril",
-                            "drug_class": "ACE Inhibitor",
-                            "mechanism": "ACE inhibition",
-                            "efficacy": "Similar efficacy for hypertension",
-                            "safety_profile": "Generally well tolerated",
-                            "cost_category": "Generic - Low cost"
-                        },
-                        {
-                            "drug_name": "Losartan",
-                            "drug_class": "ARB",
-                            "mechanism": "Angiotensin receptor blocking",
-                            "efficacy": "Equivalent efficacy",
-                            "safety_profile": "Lower cough incidence than ACE inhibitors",
-                            "cost_category": "Generic - Low cost"
-                        }
-                    ],
-                    "contraindications_considered": contraindications
-                }
-                
-                print(f"🔄 Found {len(mock_result['alternatives'])} alternative(s)")
-                return json.dumps(mock_result)
-                
-            elif function_name == "check_clinical_criteria":
-                drug_name = function_args.get("drug_name", "")
-                indication = function_args.get("indication", "")
-                member_id = function_args.get("member_id", "")
-                
-                print(f"📋 Checking clinical criteria for {drug_name}")
-                
-                mock_result = {
-                    "drug_name": drug_name,
-                    "indication": indication,
-                    "member_id": member_id,
-                    "criteria_met": True,
-                    "clinical_requirements": [
-                        {
-                            "requirement": "Appropriate diagnosis",
-                            "status": "Met",
-                            "evidence": "ICD-10 code I10 - Essential hypertension"
-                        },
-                        {
-                            "requirement": "First-line therapy trial",
-                            "status": "Met",
-                            "evidence": "Previous ACE inhibitor trial documented"
-                        },
-                        {
-                            "requirement": "Age appropriateness",
-                            "status": "Met",
-                            "evidence": "Patient age 39 - within approved range"
-                        }
-                    ],
-                    "approval_recommendation": "Approve - All clinical criteria met"
-                }
-                
-                print(f"✅ Clinical criteria: {mock_result['approval_recommendation']}")
-                return json.dumps(mock_result)
-                
-            elif function_name == "check_allergies":
-                member_id = function_args.get("member_id", "")
-                drug_name = function_args.get("drug_name", "")
-                
-                print(f"🚨 Checking allergies for {drug_name}")
-                
-                mock_result = {
-                    "member_id": member_id,
-                    "drug_checked": drug_name,
-                    "allergy_found": False,
-                    "member_allergies": [
-                        {
-                            "allergen": "Penicillin",
-                            "reaction": "Rash",
-                            "severity": "Mild",
-                            "date_reported": "2020-03-15"
-                        }
-                    ],
-                    "cross_sensitivity_check": {
-                        "potential_cross_reactions": [],
-                        "safe_to_use": True
-                    }
-                }
-                
-                status = "Safe" if mock_result["safe_to_use"] else "Caution"
-                print(f"🚨 Allergy check: {status}")
-                return json.dumps(mock_result)
-                
-            elif function_name == "get_dosing_guidance":
-                drug_name = function_args.get("drug_name", "")
-                indication = function_args.get("indication", "")
-                age = function_args.get("age", 0)
-                
-                print(f"💊 Getting dosing guidance for {drug_name}")
-                
-                mock_result = {
-                    "drug_name": drug_name,
-                    "indication": indication,
-                    "patient_age": age,
-                    "recommended_dosing": {
-                        "starting_dose": "5mg once daily",
-                        "maximum_dose": "40mg once daily",
-                        "titration_schedule": "Increase by 5-10mg every 2-4 weeks as tolerated",
-                        "special_considerations": [
-                            "Take with or without food",
-                            "Monitor blood pressure and kidney function",
-                            "Reduce dose in elderly patients"
-                        ]
-                    },
-                    "age_specific_notes": "Adult dosing appropriate for age 39",
-                    "monitoring_parameters": [
-                        "Blood pressure",
-                        "Serum creatinine",
-                        "Serum potassium"
-                    ]
-                }
-                
-                print(f"💊 Dosing: {mock_result['recommended_dosing']['starting_dose']}")
-                return json.dumps(mock_result)
-                
-            elif function_name == "safety_alert_check":
-                drug_name = function_args.get("drug_name", "")
-                alert_type = function_args.get("alert_type")
-                
-                print(f"⚠️ Checking safety alerts for {drug_name}")
-                
-                mock_result = {
-                    "drug_name": drug_name,
-                    "alert_type_checked": alert_type or "all",
-                    "active_alerts": [
-                        {
-                            "alert_type": "safety_communication",
-                            "date_issued": "2024-08-15",
-                            "title": "Risk of angioedema with ACE inhibitors",
-                            "summary": "Rare but serious risk of angioedema, particularly in first month of therapy",
-                            "action_required": "Monitor patients for signs of angioedema, especially during initiation",
-                            "severity": "Important"
-                        }
-                    ],
-                    "recalls": [],
-                    "boxed_warnings": []
-                }
-                
-                print(f"⚠️ Found {len(mock_result['active_alerts'])} active alert(s)")
-                return json.dumps(mock_result)
-            
-            else:
-                return json.dumps({"error": f"Unknown function: {function_name}"})
-                
+            return handler(self, function_args)
         except Exception as e:
             error_msg = f"Error in {function_name}: {str(e)}"
-            print(f"❌ {error_msg}")
-            return json.dumps({"error": error_msg})
+            logger.error("❌ %s", error_msg)
+            return dumps({"error": error_msg})
@@ -6,307 +6,294 @@ Can hand off to other agents when needed (e.g., authentication, pharmacy service
 Now uses OpenAI Chat Completions API with streaming instead of Assistants API.
 """
 
-import json
+import logging
+import math
+import threading
 import time
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Dict, Any, Optional, Iterator, List
 from core.agent_coordinator import BaseAgent, AgentType, HandoffRequest, CoordinationMode
-from openai import OpenAI
+from core.models import SearchMode
+from openai import AsyncOpenAI
+from core.serialization import dumps
 from services.mock_services import MockPBMServices
 from services.pricing_calculator import MathCalculator
 from core.shared_prompts import get_shared_context_awareness, get_shared_handoff_rules
 
-class PricingAgent(BaseAgent):
-    """Specialized agent for drug pricing and cost calculations"""    
-    def __init__(self, client: OpenAI, model: str = "gpt-4.1"):
-        super().__init__(client, AgentType.PRICING, coordinator=None, model=model)
-        self.pbm_services = MockPBMServices()
-        self.math_calculator = MathCalculator()
-        
-        # Set agent-specific properties
-        self.agent_name = "Pricing"
-        self.agent_emoji = "💰"
-          # Initialize tools and system prompt
-        self.system_prompt = self.get_system_prompt()
-        self.tools = self.get_tools()
-    
-    def get_system_prompt(self) -> str:
-        """Get the system prompt for the pricing agent"""
-        # Base pricing agent prompt
-        base_prompt = """
+logger = logging.getLogger(__name__)
+
+LOOKUP_CACHE_SIZE = 1024  # Cached PBM lookup results kept per agent
+LOOKUP_CACHE_TTL_S = 300.0  # Seconds a cached lookup result stays valid
+RX_PRICE_CACHE_TTL_S = 60.0  # Shorter window for member-specific price quotes
+
+# Debug output templates for the PBM tools
+_NDC_HEADER_FMT = "💊 NDC Lookup Results for '%s' (mode: %s):"
+_NDC_DRUG_FMT = "   %d. %s - NDC: %s\n      Strength: %s, Form: %s\n      Type: %s, Match: %.2f"
+_PRICE_FMT = (
+    "💰 Prescription Price Calculation:\n   Plan Price: $%s\n   Member Cost: $%s\n"
+    "   Plan Paid: $%s\n   Pricing Basis: %s\n   Context: %s"
+)
+_ALTERNATIVES_HEADER_FMT = "🔄 Formulary Alternatives for NDC %s:"
+_ALTERNATIVE_FMT = "   %d. NDC: %s"
+
+# Stateless services shared by every pricing agent (the PBM client is created on first use)
+_PBM_SERVICES = MockPBMServices()
+_MATH_CALCULATOR = MathCalculator()
+
+# Pricing agent role and guidelines
+_BASE_PROMPT = """
 You are a specialized drug pricing voice agent for a Pharmacy Benefits Manager (PBM).
 Your expertise is in helping users find their medications and explaining drug costs, insurance benefits, and pricing estimates.
 You make it easy for customers, often older Medicare patients, to find and understand drug costs, as well as explore alternatives.
 Keep answers bite-sized and conversational. Do not overwhelm with long lists.
-Always show your mathematical work clearly using the calculation functions.
+Always show your mathematical work clearly. For any cost math, write the whole computation as one expression and make a single calculate call (e.g. 'min(25, (95 + 2.5) * 0.2)'); do trivial arithmetic inline.
 Use the 'request_handoff' function only when the request is truly outside your expertise.
 Don't call the ndc function if the user doesn't know their medication name. Help them figure it out first based on your knowledge.
 Never ask for an NDC code directly; instead, ask for the drug name or other identifying information. Your conversation partner doesn't know anything about NDC codes.
 You do not need to ask about insurance or member ID, as the pricing system will always have access to the member's insurance information once authenticated.
 """
-        # Shared context awareness and handoff rules
-        context_awareness = get_shared_context_awareness()
-        handoff_rules = get_shared_handoff_rules(AgentType.PRICING, self.coordination_mode)
-        
-        # Pricing-specific clarification rules
-        clarification_rules = """
+
+# Pricing-specific clarification rules
+_CLARIFICATION_RULES = """
 CLARIFICATION RULES:
 - After providing a specific dollar amount, you MUST answer follow-up questions about that amount directly.
 - If the user asks "So I pay $X?" or "What's my out-of-pocket?", refer to your previous calculation.
 - Only hand off plan structure or benefit policy questions without specific amounts to the Benefits agent.
 - Always hand off to Pharmacy agent for prescription status or refill requests.
 """
-        return base_prompt + context_awareness + handoff_rules + clarification_rules
+
+# Mode-independent part of the pricing prompt, kept first so every request shares the longest
+# possible prefix for server-side prompt caching; only the handoff rules vary by mode
+_PRICING_PROMPT_PREFIX = (
+    _BASE_PROMPT
+    + get_shared_context_awareness()
+    + _CLARIFICATION_RULES
+)
+
+@lru_cache(maxsize=None)
+def _pricing_prompt(coordination_mode: CoordinationMode) -> str:
+    """Pricing agent system prompt, assembled once per coordination mode"""
+    return _PRICING_PROMPT_PREFIX + get_shared_handoff_rules(AgentType.PRICING, coordination_mode)
+
+# Pricing tool schemas, shared by every instance; the handoff tool is added per mode
+_PRICING_TOOLS: tuple = (
+    # Core PBM Functions
+    {
+        "type": "function",
+        "function": {
+            "name": "ndcLookup",
+            "description": "Search for drugs by name to lookup and find specific drug products with NDCs",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "Drug name, NDC, or search term"},
+                    "mode": {
+                        "type": "string", 
+                        "enum": ["exact", "search"],
+                        "description": "Search mode: 'exact' for precise matches, 'search' for broader results",
+                        "default": "search"
+                    }
+                },
+                "required": ["query"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "calculateRxPrice",
+            "description": "Calculate prescription price with member cost and plan cost breakdown, taking into account member's insurance and other plan details. Requires an authenticated member ID.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "ndc": {"type": "string", "description": "National Drug Code"},
+                    "memberId": {"type": "string", "description": "Member ID"}
+                },
+                "required": ["ndc", "pharmacyNpi", "memberId", "fillDate"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "getFormularyAlternatives",
+            "description": "Get list of formulary alternative NDCs for a given drug",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "planId": {"type": "string", "description": "Plan identifier"},
+                    "ndc": {"type": "string", "description": "NDC to find alternatives for"}
+                },
+                "required": ["planId", "ndc"]
+            }
+        }
+    },
+    # Math/Calculator function
+    {
+        "type": "function",
+        "function": {
+            "name": "calculate",
+            "description": "Evaluate an arithmetic expression, e.g. '(95 + 2.5) * 0.2' or 'min(25, 97.5 * 0.2)'. Supports + - * /, parentheses, min and max; the result is rounded to cents.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "expression": {"type": "string", "description": "Arithmetic expression using numbers only"}
+                },
+                "required": ["expression"]
+            }
+        }
+    }
+)
+
+def _number_result(value: float) -> str:
+    """{"result": value} as JSON; Python's repr of a finite int or float is already a JSON number"""
+    if not math.isfinite(value):
+        raise ValueError(f"Result is not a finite number: {value}")
+    return '{"result":' + repr(value) + '}'
+
+class PricingAgent(BaseAgent):
+    """Specialized agent for drug pricing and cost calculations"""
+    
+    __slots__ = ("pbm_services", "math_calculator", "_lookup_cache", "_lookup_cache_lock")
+    
+    def __init__(self, client: AsyncOpenAI, model: str = "gpt-4.1"):
+        super().__init__(client, AgentType.PRICING, coordinator=None, model=model)
+        self.pbm_services = _PBM_SERVICES
+        self.math_calculator = _MATH_CALCULATOR
+        # (tool, *args) -> (expires_at, serialized result) for PBM calls that are stable per input
+        self._lookup_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lookup_cache_lock = threading.Lock()  # Tool calls run on worker threads
+        
+        # Set agent-specific properties
+        self.agent_name = "Pricing"
+        self.agent_emoji = "💰"
+          # Initialize tools and system prompt
+        self.system_prompt = self.get_system_prompt()
+        self.tools = self.get_tools()
+    
+    def get_system_prompt(self) -> str:
+        """Get the system prompt for the pricing agent"""
+        return _pricing_prompt(self.coordination_mode)
     
     def get_tools(self) -> List[Dict[str, Any]]:
         """Get the tools configuration for the pricing agent"""
-        tools = [
-            # Core PBM Functions
-            {
-                "type": "function",
-                "function": {
-                    "name": "ndcLookup",
-                    "description": "Search for drugs by name to lookup and find specific drug products with NDCs",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "query": {"type": "string", "description": "Drug name, NDC, or search term"},
-                            "mode": {
-                                "type": "string", 
-                                "enum": ["exact", "search"],
-                                "description": "Search mode: 'exact' for precise matches, 'search' for broader results",
-                                "default": "search"
-                            }
-                        },
-                        "required": ["query"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "calculateRxPrice",
-                    "description": "Calculate prescription price with member cost and plan cost breakdown, taking into account member's insurance and other plan details. Requires an authenticated member ID.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "ndc": {"type": "string", "description": "National Drug Code"},
-                            "memberId": {"type": "string", "description": "Member ID"}
-                        },
-                        "required": ["ndc", "pharmacyNpi", "memberId", "fillDate"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "getFormularyAlternatives",
-                    "description": "Get list of formulary alternative NDCs for a given drug",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "planId": {"type": "string", "description": "Plan identifier"},
-                            "ndc": {"type": "string", "description": "NDC to find alternatives for"}
-                        },
-                        "required": ["planId", "ndc"]
-                    }
-                }
-            },
-            # Math/Calculator functions
-            {
-                "type": "function",
-                "function": {
-                    "name": "add",
-                    "description": "Add two numbers",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "a": {"type": "number"},
-                            "b": {"type": "number"}
-                        },
-                        "required": ["a", "b"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "subtract",
-                    "description": "Subtract two numbers",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "a": {"type": "number"},
-                            "b": {"type": "number"}
-                        },
-                        "required": ["a", "b"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "multiply",
-                    "description": "Multiply two numbers",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "a": {"type": "number"},
-                            "b": {"type": "number"}
-                        },
-                        "required": ["a", "b"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "divide",
-                    "description": "Divide two numbers",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "a": {"type": "number"},
-                            "b": {"type": "number"}
-                        },
-                        "required": ["a", "b"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "calculate_percentage",
-                    "description": "Calculate percentage of amount",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "amount": {"type": "number"},
-                            "percentage": {"type": "number"}
-                        },
-                        "required": ["amount", "percentage"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "apply_minimum",
-                    "description": "Apply minimum value",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "value": {"type": "number"},
-                            "minimum": {"type": "number"}
-                        },
-                        "required": ["value", "minimum"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "apply_maximum",
-                    "description": "Apply maximum value",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "value": {"type": "number"},
-                            "maximum": {"type": "number"}
-                        },
-                        "required": ["value", "maximum"]
-                    }
-                }
-            }        ]
+        return [*_PRICING_TOOLS, self.get_handoff_tool()]
+    
+    def _cached_lookup(self, key: tuple) -> Optional[str]:
+        """Serialized result for key if cached and not yet expired"""
+        with self._lookup_cache_lock:
+            entry = self._lookup_cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._lookup_cache[key]
+                return None
+            self._lookup_cache.move_to_end(key)
+            return entry[1]
+    
+    def _cache_lookup(self, key: tuple, result: str, ttl_s: float = LOOKUP_CACHE_TTL_S) -> str:
+        """Remember a serialized result, evicting the least recently used beyond the cap"""
+        with self._lookup_cache_lock:
+            self._lookup_cache[key] = (time.monotonic() + ttl_s, result)
+            self._lookup_cache.move_to_end(key)
+            if len(self._lookup_cache) > LOOKUP_CACHE_SIZE:
+                self._lookup_cache.popitem(last=False)
+        return result
+    
+    def _ndc_lookup(self, function_args: Dict[str, Any]) -> str:
+        query = function_args["query"]
+        mode = SearchMode(function_args.get("mode", "search"))
         
-        # Add handoff function from base class
-        tools.append(self.get_handoff_tool())
-        return tools
+        cache_key = ("ndcLookup", " ".join(query.lower().split()), mode.value)
+        cached = self._cached_lookup(cache_key)
+        if cached is not None:
+            logger.debug("⚡ Cached NDC lookup for '%s' (mode: %s)", query, mode)
+            return cached
+        
+        result = self.pbm_services.ndc_lookup(query, mode)
+        if logger.isEnabledFor(logging.DEBUG):
+            lines = [_NDC_HEADER_FMT % (query, mode)]
+            lines.extend(
+                _NDC_DRUG_FMT % (i, drug.drug_name, drug.ndc, drug.strength, drug.dosage_form, drug.brand_generic, drug.match)
+                for i, drug in enumerate(result.result, 1)
+            )
+            logger.debug("\n".join(lines))
+        
+        return self._cache_lookup(cache_key, result.model_dump_json())
+    
+    def _calculate_rx_price(self, function_args: Dict[str, Any]) -> str:
+        ndc = function_args["ndc"]
+        member_id = function_args["memberId"]
+        
+        # Re-asks about the same drug and member reuse the quote instead of repricing it
+        cache_key = ("calculateRxPrice", ndc, member_id)
+        cached = self._cached_lookup(cache_key)
+        if cached is not None:
+            logger.debug("⚡ Cached price for NDC %s, member %s", ndc, member_id)
+            return cached
+        
+        result = self.pbm_services.calculate_rx_price(ndc, member_id)
+        price = result.result
+        logger.debug(
+            _PRICE_FMT,
+            price.drug_cost, price.member_cost, price.plan_paid, price.pricing_basis, price.context
+        )
+        
+        return self._cache_lookup(cache_key, result.model_dump_json(), RX_PRICE_CACHE_TTL_S)
+    
+    def _get_formulary_alternatives(self, function_args: Dict[str, Any]) -> str:
+        plan_id = function_args["planId"]
+        ndc = function_args["ndc"]
+        
+        cache_key = ("getFormularyAlternatives", plan_id, ndc)
+        cached = self._cached_lookup(cache_key)
+        if cached is not None:
+            logger.debug("⚡ Cached formulary alternatives for NDC %s", ndc)
+            return cached
+        
+        result = self.pbm_services.get_formulary_alternatives(plan_id, ndc)
+        if logger.isEnabledFor(logging.DEBUG):
+            lines = [_ALTERNATIVES_HEADER_FMT % ndc]
+            if result.result:
+                lines.extend(_ALTERNATIVE_FMT % (i, alt_ndc) for i, alt_ndc in enumerate(result.result, 1))
+            else:
+                lines.append("   No alternatives found")
+            logger.debug("\n".join(lines))
+        
+        return self._cache_lookup(cache_key, result.model_dump_json())
+    
+    def _calculate(self, function_args: Dict[str, Any]) -> str:
+        expression = function_args["expression"]
+        result = self.math_calculator.evaluate(expression)
+        logger.debug("📊 Math: %s = %s", expression, result)
+        return _number_result(result)
+    
+    # Tool name -> handler, built once with the class
+    _TOOL_HANDLERS = {
+        "ndcLookup": _ndc_lookup,
+        "calculateRxPrice": _calculate_rx_price,
+        "getFormularyAlternatives": _get_formulary_alternatives,
+        "calculate": _calculate,
+    }
+    
+    # Tools that call out to the PBM services; the rest are in-memory arithmetic
+    _BLOCKING_TOOLS = frozenset({"ndcLookup", "calculateRxPrice", "getFormularyAlternatives"})
+    
+    async def handle_tool_call_async(self, function_name: str, function_args: Dict[str, Any]) -> str:
+        """Offload PBM service calls to a worker thread; run arithmetic inline on the event loop"""
+        if function_name in self._BLOCKING_TOOLS:
+            return await super().handle_tool_call_async(function_name, function_args)
+        return self.handle_tool_call(function_name, function_args)
+    
     def handle_tool_call(self, function_name: str, function_args: Dict[str, Any]) -> str:
         """Handle tool calls with console output"""
+        handler = self._TOOL_HANDLERS.get(function_name)
+        if handler is None:
+            return dumps({"error": f"Unknown function: {function_name}"})
         try:
-            # Core PBM Functions
-            if function_name == "ndcLookup":
-                from core.models import SearchMode
-                query = function_args["query"]
-                mode = SearchMode(function_args.get("mode", "search"))
-                
-                result = self.pbm_services.ndc_lookup(query, mode)
-                print(f"💊 NDC Lookup Results for '{query}' (mode: {mode}):")
-                for i, drug in enumerate(result.result, 1):
-                    print(f"   {i}. {drug.drug_name} - NDC: {drug.ndc}")
-                    print(f"      Strength: {drug.strength}, Form: {drug.dosage_form}")
-                    print(f"      Type: {drug.brand_generic}, Match: {drug.match:.2f}")
-                
-                return result.model_dump_json()
-                
-            elif function_name == "calculateRxPrice":
-                ndc = function_args["ndc"]
-                member_id = function_args["memberId"]
-                
-                result = self.pbm_services.calculate_rx_price(ndc, member_id)
-                print(f"💰 Prescription Price Calculation:")
-                print(f"   Plan Price: ${result.result.drug_cost}")
-                print(f"   Member Cost: ${result.result.member_cost}")
-                print(f"   Plan Paid: ${result.result.plan_paid}")
-                print(f"   Pricing Basis: {result.result.pricing_basis}")
-                print(f"   Context: {result.result.context}")
-                
-                return result.model_dump_json()
-                
-            elif function_name == "getFormularyAlternatives":
-                plan_id = function_args["planId"]
-                ndc = function_args["ndc"]
-                
-                result = self.pbm_services.get_formulary_alternatives(plan_id, ndc)
-                print(f"🔄 Formulary Alternatives for NDC {ndc}:")
-                if result.result:
-                    for i, alt_ndc in enumerate(result.result, 1):
-                        print(f"   {i}. NDC: {alt_ndc}")
-                else:
-                    print("   No alternatives found")
-                
-                return result.model_dump_json()
-            
-            # Math functions
-            elif function_name == "add":
-                result = self.math_calculator.add(**function_args)
-                print(f"📊 Math: {function_args['a']} + {function_args['b']} = {result}")
-                return json.dumps({"result": result})
-                
-            elif function_name == "subtract":
-                result = self.math_calculator.subtract(**function_args)
-                print(f"📊 Math: {function_args['a']} - {function_args['b']} = {result}")
-                return json.dumps({"result": result})
-                
-            elif function_name == "multiply":
-                result = self.math_calculator.multiply(**function_args)
-                print(f"📊 Math: {function_args['a']} × {function_args['b']} = {result}")
-                return json.dumps({"result": result})
-                
-            elif function_name == "divide":
-                result = self.math_calculator.divide(**function_args)
-                print(f"📊 Math: {function_args['a']} ÷ {function_args['b']} = {result}")
-                return json.dumps({"result": result})
-                
-            elif function_name == "calculate_percentage":
-                result = self.math_calculator.calculate_percentage(**function_args)
-                print(f"📊 Math: {function_args['percentage']}% of {function_args['amount']} = {result}")
-                return json.dumps({"result": result})
-                
-            elif function_name == "apply_minimum":
-                result = self.math_calculator.apply_minimum(**function_args)
-                print(f"📊 Math: max({function_args['value']}, {function_args['minimum']}) = {result}")
-                return json.dumps({"result": result})
-                
-            elif function_name == "apply_maximum":
-                result = self.math_calculator.apply_maximum(**function_args)
-                print(f"📊 Math: min({function_args['value']}, {function_args['maximum']}) = {result}")
-                return json.dumps({"result": result})
-                
-            else:
-                return json.dumps({"error": f"Unknown function: {function_name}"})
-                
+            return handler(self, function_args)
         except Exception as e:
             error_msg = f"Error in {function_name}: {str(e)}"
-            print(f"❌ {error_msg}")
-            return json.dumps({"error": error_msg})
+            logger.error("❌ %s", error_msg)
+            return dumps({"error": error_msg})
@@ -7,13 +7,26 @@ between them based on user intent and conversation context.
 Now uses OpenAI Completion API with streaming instead of Assistant API.
 """
 
-import json
+import asyncio
+import copy
+import hashlib
+import io
+import logging
+import re
+import sys
 import time
-from typing import List, Dict, Any, Optional, Iterator, Generator
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import List, Dict, Any, Optional, Iterator, Generator, AsyncIterator
 from enum import Enum
-from openai import OpenAI
-from dataclasses import dataclass
+import httpx
+from openai import AsyncOpenAI
+from dataclasses import dataclass, field
 import config.keys as keys
+from core.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
 
 class AgentType(Enum):
     """Types of specialized agents"""
@@ -29,6 +42,194 @@ class CoordinationMode(Enum):
     COORDINATOR = "coordinator"  # Agents always handoff back to coordinator
     SWARM = "swarm"             # Agents can handoff directly to each other
 
+# Handoff tool per coordination mode, shared by every agent
+_HANDOFF_TOOLS: Dict[CoordinationMode, Dict[str, Any]] = {
+    # In coordinator mode, agents only hand back to coordinator
+    CoordinationMode.COORDINATOR: {
+        "type": "function",
+        "function": {
+            "name": "request_handoff",
+            "description": "Hand off back to coordinator when request is outside your expertise",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "agent_type": {
+                        "type": "string",
+                        "enum": ["coordinator"],
+                        "description": "Always hand off to coordinator in coordinator mode",
+                        "default": "coordinator"
+                    },
+                    "reason": {"type": "string", "description": "Why handoff is needed"},
+                    "context_summary": {"type": "string", "description": "Context for coordinator to make routing decision"}
+                },
+                "required": ["reason", "context_summary"]
+            }
+        }
+    },
+    # In swarm mode, agents can handoff directly to other agents
+    CoordinationMode.SWARM: {
+        "type": "function",
+        "function": {
+            "name": "request_handoff",
+            "description": "Hand off to another specialized agent",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "agent_type": {
+                        "type": "string",
+                        "enum": ["authentication", "pharmacy", "benefits", "clinical", "pricing"],
+                        "description": "Which agent to hand off to"
+                    },
+                    "reason": {"type": "string", "description": "Why handoff is needed"},
+                    "context_summary": {"type": "string", "description": "Context for receiving agent"}
+                },
+                "required": ["agent_type", "reason", "context_summary"]
+            }
+        }
+    }
+}
+
+# Agent type lookup by enum value; avoids Enum.__call__ on every handoff
+_AGENT_TYPE_BY_NAME: Dict[str, AgentType] = {member.value: member for member in AgentType}
+
+# Most recent history lines the coordinator sees when routing; older lines are compacted
+MAX_SUMMARY_LINES = 20
+
+# Hard bound on retained history entries per conversation; oldest entries are dropped first
+MAX_HISTORY_MESSAGES = 500
+
+# Most recent handoffs kept in the conversation context's handoff_chain
+MAX_HANDOFF_CHAIN = 20
+
+# Unambiguous intent keywords, mirroring the coordinator's handoff rules. A request that
+# matches exactly one agent is routed without a coordinator completion.
+_ROUTING_KEYWORDS: Dict[AgentType, tuple] = {
+    AgentType.PHARMACY: ("refill", "refills", "pickup", "pick up", "ready for pickup", "transfer my prescription", "prescription status"),
+    AgentType.AUTHENTICATION: ("log in", "login", "sign in", "authenticate", "verify my identity"),
+    AgentType.PRICING: ("price", "prices", "pricing", "cost", "costs", "how much"),
+    AgentType.BENEFITS: ("deductible", "coverage", "covered", "prior authorization", "plan details"),
+    AgentType.CLINICAL: ("interaction", "interactions", "side effect", "side effects", "alternative", "alternatives"),
+}
+_ROUTING_PATTERN = re.compile(
+    "|".join(
+        rf"(?P<{agent_type.value}>\b(?:{'|'.join(map(re.escape, keywords))})\b)"
+        for agent_type, keywords in _ROUTING_KEYWORDS.items()
+    ),
+    re.IGNORECASE
+)
+
+# Concurrent sessions in process_messages_batch, kept under API rate limits
+BATCH_CONCURRENCY = 16
+
+# Opening-turn routing decisions remembered per normalized user message (least recently used evicted first)
+ROUTE_CACHE_SIZE = 1024
+
+# Connection pool for the shared API client; a handoff chain keeps several streams open per turn
+HTTP_LIMITS = httpx.Limits(max_connections=128, max_keepalive_connections=64)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+# Worker threads for blocking tool calls (PBM lookups wait on the network), shared by every turn on the loop
+TOOL_WORKERS = 32
+
+# Interned message roles so history checks compare the same string objects
+ROLE_SYSTEM = "system"
+ROLE_USER = "user"
+ROLE_ASSISTANT = "assistant"
+ROLE_TOOL = "tool"
+
+# dataclass(slots=...) needs Python 3.10; older interpreters get a regular frozen dataclass
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
+class ConversationMessage:
+    """Single conversation history entry"""
+    role: str
+    content: Optional[str] = None
+    tool_calls: Optional[tuple] = None
+    tool_call_id: Optional[str] = None
+    agent: Optional[str] = None  # Coordinator metadata, never sent to the API
+    timestamp_ns: int = 0        # Coordinator metadata (time.monotonic_ns), never sent to the API
+    
+    def to_api(self) -> Dict[str, Any]:
+        """Render as a Chat Completions message, skipping metadata and unset fields"""
+        if self.role == ROLE_TOOL:
+            return {"role": ROLE_TOOL, "tool_call_id": self.tool_call_id, "content": self.content or ""}
+        if self.tool_calls:
+            return {"role": self.role, "content": self.content, "tool_calls": list(self.tool_calls)}
+        return {"role": self.role, "content": self.content}
+
+# Anchors for turning monotonic timestamps into wall-clock times for display only
+_WALL_EPOCH = time.time()
+_MONOTONIC_EPOCH_NS = time.monotonic_ns()
+
+def _wall_clock(timestamp_ns: int) -> float:
+    """Wall-clock seconds for a time.monotonic_ns() timestamp"""
+    return _WALL_EPOCH + (timestamp_ns - _MONOTONIC_EPOCH_NS) / 1e9
+
+def _report_prompt_cache(label: str, usage: Any) -> None:
+    """Log how much of a request's prompt was served from OpenAI's prompt cache"""
+    details = getattr(usage, "prompt_tokens_details", None) if usage else None
+    cached = getattr(details, "cached_tokens", None) or 0
+    if usage and cached:
+        logger.debug("🧊 %s prompt cache: %s/%s tokens cached", label, cached, usage.prompt_tokens)
+
+class ConversationLog(deque):
+    """Bounded conversation history that counts every append.
+
+    ``appended`` keeps growing after old entries fall off the left end, so it
+    serves as a stable version number for readers sharing the log by reference.
+    Only right-end appends and ``clear`` are supported; mutators that would
+    reorder or remove retained entries raise TypeError.
+    """
+    
+    def __init__(self, iterable=(), maxlen: Optional[int] = MAX_HISTORY_MESSAGES):
+        super().__init__(iterable, maxlen)
+        self.appended = len(self)
+        # API renderings of the retained entries, filled lazily and kept aligned with the log
+        self._rendered: deque = deque(maxlen=maxlen)
+        self._rendered_upto = 0
+    
+    def append(self, entry: ConversationMessage) -> None:
+        super().append(entry)
+        self.appended += 1
+    
+    def extend(self, entries) -> None:
+        for entry in entries:
+            self.append(entry)
+    
+    def __iadd__(self, entries) -> "ConversationLog":
+        self.extend(entries)
+        return self
+    
+    def clear(self) -> None:
+        """Drop every retained entry; the version keeps counting from where it was"""
+        super().clear()
+        self._rendered.clear()
+        self._rendered_upto = self.appended
+    
+    def _append_only(self, *args, **kwargs):
+        raise TypeError("ConversationLog is append-only")
+    
+    appendleft = extendleft = insert = pop = popleft = remove = rotate = _append_only
+    __setitem__ = __delitem__ = _append_only
+    
+    def upto(self, version: int) -> Iterator[ConversationMessage]:
+        """Retained entries that were already present at ``version``"""
+        return islice(self, max(0, len(self) - (self.appended - version)))
+    
+    def since(self, version: int) -> Iterator[ConversationMessage]:
+        """Retained entries appended after ``version``"""
+        return islice(self, max(0, len(self) - (self.appended - version)), None)
+    
+    def rendered(self, version: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """API messages for the retained entries up to ``version``, rendering each entry only once"""
+        if self._rendered_upto < self.appended:
+            self._rendered.extend(entry.to_api() for entry in self.since(self._rendered_upto))
+            self._rendered_upto = self.appended
+        if version is None:
+            return iter(self._rendered)
+        return islice(self._rendered, max(0, len(self._rendered) - (self.appended - version)))
+
 @dataclass
 class HandoffRequest:
     """Request to hand off conversation to another agent"""
@@ -44,24 +245,44 @@ class AgentResponse:
     agent_type: AgentType
     message: str
     handoff_request: Optional[HandoffRequest] = None
-    function_calls: List[Dict[str, Any]] = None
+    function_calls: List[Dict[str, Any]] = field(default_factory=list)
     completed: bool = False
 
 class BaseAgent:
     """Base class for all specialized agents using Completion API with streaming"""
     
-    def __init__(self, client: OpenAI, agent_type: AgentType, coordinator=None, model: str = "gpt-4o-mini"):
+    # Fixed attribute set: no per-instance __dict__, and batch sessions copy agents cheaply
+    __slots__ = (
+        "client", "agent_type", "coordinator", "model", "conversation_history",
+        "_tools", "_tool_kwargs", "system_prompt", "coordination_mode",
+        "enable_parallel_tool_execution", "agent_name", "agent_emoji",
+    )
+    
+    def __init__(self, client: AsyncOpenAI, agent_type: AgentType, coordinator=None, model: str = "gpt-4o-mini"):
         self.client = client
         self.agent_type = agent_type
         self.coordinator = coordinator  # Reference to coordinator for handoffs
         self.model = model  # Allow each agent to specify its model
-        self.conversation_history = []
-        self.tools = []
+        self.conversation_history = ConversationLog()
+        self.tools = ()
         self.system_prompt = ""
         self.coordination_mode = CoordinationMode.SWARM  # Default mode, will be set by coordinator
+        self.enable_parallel_tool_execution = True  # Run independent tool calls concurrently
         # Agent-specific properties (can be overridden by subclasses)
         self.agent_name = agent_type.value.title()
         self.agent_emoji = "🤖"
+    
+    @property
+    def tools(self) -> tuple:
+        """Tool schemas offered to the model (frozen once assigned)"""
+        return self._tools
+    
+    @tools.setter
+    def tools(self, tools) -> None:
+        # Build the request kwargs once per assignment instead of on every completion;
+        # with no tools the parameters are omitted entirely
+        self._tools = tuple(tools)
+        self._tool_kwargs = {"tools": list(self._tools), "tool_choice": "auto"} if self._tools else {}
         
     def request_handoff(self, to_agent: AgentType, reason: str, context_summary: str, user_message: str):
         """Request a handoff to another agent"""
@@ -69,27 +290,18 @@ class BaseAgent:
             # In coordinator mode, all handoffs go back to coordinator
             if self.coordination_mode == CoordinationMode.COORDINATOR:
                 target_agent = AgentType.COORDINATOR
-                print(f"🔄 {self.agent_type.value} agent requesting handoff to coordinator (coordinator mode): {reason}")
+                logger.info("🔄 %s agent requesting handoff to coordinator (coordinator mode): %s", self.agent_type.value, reason)
                 # Include the intended final destination in the context
                 context_summary = f"[INTENDED FOR {to_agent.value.upper()}] {context_summary}"
             else:
                 # In swarm mode, direct handoffs are allowed
                 target_agent = to_agent
-                print(f"🔄 {self.agent_type.value} agent requesting handoff to {to_agent.value} (swarm mode): {reason}")
-            
-            # Merge local agent conversation history with coordinator history for complete context
-            merged_history = self.coordinator.conversation_history.copy()
+                logger.info("🔄 %s agent requesting handoff to %s (swarm mode): %s", self.agent_type.value, to_agent.value, reason)
             
-            # Add ALL messages from this agent's conversation history that aren't already in coordinator history
-            for msg in self.conversation_history:
-                if msg not in merged_history:
-                    # Include all message types: user, assistant, tool, etc.
-                    merged_history.append(msg)
-            
-            # Include full conversation history and current context in handoff
+            # The next agent reads the coordinator's shared history by reference (history_version),
+            # so the handoff carries only the routing context
             handoff_context = {
                 "summary": context_summary,
-                "conversation_history": merged_history,
                 "previous_agent": self.agent_type.value,
                 "handoff_reason": reason,
                 "intended_agent": to_agent.value if self.coordination_mode == CoordinationMode.COORDINATOR else None
@@ -107,193 +319,206 @@ class BaseAgent:
     
     def get_handoff_tool(self) -> Dict[str, Any]:
         """Get the handoff tool based on coordination mode"""
-        if self.coordination_mode == CoordinationMode.COORDINATOR:
-            # In coordinator mode, agents only hand back to coordinator
-            return {
-                "type": "function",
-                "function": {
-                    "name": "request_handoff",
-                    "description": "Hand off back to coordinator when request is outside your expertise",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "agent_type": {
-                                "type": "string",
-                                "enum": ["coordinator"],
-                                "description": "Always hand off to coordinator in coordinator mode",
-                                "default": "coordinator"
-                            },
-                            "reason": {"type": "string", "description": "Why handoff is needed"},
-                            "context_summary": {"type": "string", "description": "Context for coordinator to make routing decision"}
-                        },
-                        "required": ["reason", "context_summary"]
-                    }
-                }
-            }
-        else:
-            # In swarm mode, agents can handoff directly to other agents
-            return {
-                "type": "function",
-                "function": {
-                    "name": "request_handoff",
-                    "description": "Hand off to another specialized agent",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "agent_type": {
-                                "type": "string",
-                                "enum": ["authentication", "pharmacy", "benefits", "clinical", "pricing"],
-                                "description": "Which agent to hand off to"
-                            },
-                            "reason": {"type": "string", "description": "Why handoff is needed"},
-                            "context_summary": {"type": "string", "description": "Context for receiving agent"}
-                        },
-                        "required": ["agent_type", "reason", "context_summary"]
-                    }
-                }
-            }
+        return _HANDOFF_TOOLS[self.coordination_mode]
     
     def create_agent(self) -> None:
         """Create the agent configuration - to be implemented by subclasses"""
         raise NotImplementedError
     
-    def process_message(self, message: str, context: Dict[str, Any] = None) -> Iterator[str]:
-        """Process a message and return streaming response with potential handoff, using a tool-call loop with 5-iteration failsafe."""
+    async def process_message(self, message: str, context: Dict[str, Any] = None) -> AsyncIterator[str]:
+        """Process a message and stream the response with potential handoff, using a tool-call loop with 5-iteration failsafe."""
         agent_name = getattr(self, 'agent_name', self.agent_type.value.title())
-        print(f"{getattr(self, 'agent_emoji', '🤖')} {agent_name} Agent processing: {message}")
+        logger.debug("%s %s Agent processing: %s", getattr(self, 'agent_emoji', '🤖'), agent_name, message)
         try:
             # Add user message to conversation history FIRST
-            self.conversation_history.append({"role": "user", "content": message})
+            self.conversation_history.append(ConversationMessage(role=ROLE_USER, content=message))
             # Build initial messages for completion
             messages = self._build_messages(message, context)
-            tools = self.tools            
             for loop_count in range(5):
-                response = self.client.chat.completions.create(
+                stream = await self.client.chat.completions.create(
                     model=self.model,
                     messages=messages,
-                    tools=tools,
-                    tool_choice="auto",
-                    temperature=0.7
+                    **self._tool_kwargs,
+                    temperature=0.7,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    extra_body={"prompt_cache_key": f"agent-{self.agent_type.value}"}
                 )
-                msg = response.choices[0].message                # If tool calls, handle them
-                if msg.tool_calls:
-                    # Add assistant message with tool calls to conversation history first
-                    self.conversation_history.append({
-                        "role": "assistant",
-                        "content": msg.content,
-                        "tool_calls": [
-                            {
-                                "id": call.id,
+                # Yield content deltas as they arrive and assemble tool calls by index
+                content_parts = []
+                tool_call_parts: Dict[int, Dict[str, Any]] = {}
+                try:
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            # The usage-only chunk that closes the stream
+                            _report_prompt_cache(agent_name, getattr(chunk, "usage", None))
+                            continue
+                        delta = chunk.choices[0].delta
+                        if delta.content:
+                            content_parts.append(delta.content)
+                            yield delta.content
+                        for call_delta in delta.tool_calls or []:
+                            call = tool_call_parts.setdefault(call_delta.index, {
+                                "id": None,
                                 "type": "function",
-                                "function": {
-                                    "name": call.function.name,
-                                    "arguments": call.function.arguments
-                                }
-                            } for call in msg.tool_calls
-                        ]
-                    })
+                                "function": {"name": "", "arguments": ""}
+                            })
+                            if call_delta.id:
+                                call["id"] = call_delta.id
+                            if call_delta.function:
+                                if call_delta.function.name:
+                                    call["function"]["name"] += call_delta.function.name
+                                if call_delta.function.arguments:
+                                    call["function"]["arguments"] += call_delta.function.arguments
+                finally:
+                    # Release the pooled connection right away if the consumer stops reading mid-stream
+                    await stream.close()
+                content = "".join(content_parts) or None
+                tool_calls = [tool_call_parts[index] for index in sorted(tool_call_parts)]
+                # If tool calls, handle them
+                if tool_calls:
+                    # One assistant message carrying every tool call, shared by the history and the request
+                    assistant_message = ConversationMessage(
+                        role=ROLE_ASSISTANT,
+                        content=content,
+                        tool_calls=tuple(tool_calls)
+                    )
+                    self.conversation_history.append(assistant_message)
+                    messages.append(assistant_message.to_api())
                     
-                    for call in msg.tool_calls:
-                        fn_name = call.function.name
-                        fn_args = json.loads(call.function.arguments)
-                        print(f"🔧 {agent_name} Agent calling: {fn_name} with {fn_args}")                        
+                    # Partition into handoff calls (first one wins), regular tool calls and calls
+                    # whose arguments don't decode; every call_id still gets a tool reply
+                    handoff_calls = []
+                    regular_calls = []
+                    invalid_calls = []
+                    for call in tool_calls:
+                        fn_name = call["function"]["name"]
+                        try:
+                            fn_args = loads(call["function"]["arguments"] or "{}")
+                            if not isinstance(fn_args, dict):
+                                raise ValueError("arguments must be a JSON object")
+                        except ValueError as e:
+                            logger.warning("⚠️ %s Agent sent invalid arguments for %s: %s", agent_name, fn_name, e)
+                            invalid_calls.append((call, f"Invalid arguments for {fn_name}: {str(e)}"))
+                            continue
+                        logger.debug("🔧 %s Agent calling: %s with %s", agent_name, fn_name, fn_args)
                         if fn_name == "request_handoff":
-                            agent_type_str = fn_args["agent_type"]
-                            reason = fn_args["reason"]
-                            context_summary = fn_args["context_summary"]
-                            
-                            # Add tool result to conversation history for handoff context
-                            self.conversation_history.append({
-                                "role": "tool",
-                                "tool_call_id": call.id,
-                                "content": json.dumps({"handoff_requested": True, "reason": reason})
-                            })
-                            
-                            self.request_handoff(
-                                to_agent=AgentType(agent_type_str),
-                                reason=reason,
-                                context_summary=context_summary,
-                                user_message=message
-                            )
-                            # Handoff happens silently - no message yielded, break from loop
-                            return
+                            handoff_calls.append((call, fn_args))
                         else:
-                            if hasattr(self, 'handle_tool_call'):
-                                result = self.handle_tool_call(fn_name, fn_args)
-                            else:
-                                result = json.dumps({"error": f"No handler for function {fn_name}"})
-                            # 3️⃣ feed the result back
-                            messages.append({
-                                "role": "assistant",
-                                "content": msg.content,
-                                "tool_calls": [
-                                    {
-                                        "id": call.id,
-                                        "type": "function",
-                                        "function": {
-                                            "name": fn_name,
-                                            "arguments": call.function.arguments
-                                        }
-                                    }
-                                ]
-                            })
-                            messages.append({
-                                "role": "tool",
-                                "tool_call_id": call.id,
-                                "content": result
-                            })
+                            regular_calls.append((call, fn_name, fn_args))
+                    
+                    # Run regular tool calls concurrently, or one after another if disabled
+                    if self.enable_parallel_tool_execution:
+                        results = await asyncio.gather(
+                            *(self.handle_tool_call_async(fn_name, fn_args) for _, fn_name, fn_args in regular_calls),
+                            return_exceptions=True
+                        )
+                    else:
+                        results = []
+                        for _, fn_name, fn_args in regular_calls:
+                            try:
+                                results.append(await self.handle_tool_call_async(fn_name, fn_args))
+                            except Exception as e:
+                                results.append(e)
+                    
+                    # 3️⃣ feed the results back in the original call order
+                    for (call, fn_name, _), result in zip(regular_calls, results):
+                        if isinstance(result, Exception):
+                            result = dumps({"error": f"Error in {fn_name}: {str(result)}"})
+                        tool_message = ConversationMessage(role=ROLE_TOOL, tool_call_id=call["id"], content=result)
+                        self.conversation_history.append(tool_message)
+                        messages.append(tool_message.to_api())
+                    for call, error_msg in invalid_calls:
+                        tool_message = ConversationMessage(role=ROLE_TOOL, tool_call_id=call["id"], content=dumps({"error": error_msg}))
+                        self.conversation_history.append(tool_message)
+                        messages.append(tool_message.to_api())
+                    
+                    if handoff_calls:
+                        call, fn_args = handoff_calls[0]
+                        agent_type_str = fn_args.get("agent_type")
+                        if agent_type_str is None and self.coordination_mode == CoordinationMode.COORDINATOR:
+                            # Optional in the coordinator-mode schema, which defaults it to the coordinator
+                            agent_type_str = AgentType.COORDINATOR.value
+                        reason = fn_args.get("reason", "")
+                        context_summary = fn_args.get("context_summary", "")
+                        
+                        target_agent_type = _AGENT_TYPE_BY_NAME.get(agent_type_str)
+                        if target_agent_type is None:
+                            # Let the model correct itself instead of failing the whole turn
+                            logger.warning("⚠️ %s Agent requested handoff to unknown agent: %s", agent_name, agent_type_str)
+                            for call, _ in handoff_calls:
+                                tool_message = ConversationMessage(
+                                    role=ROLE_TOOL,
+                                    tool_call_id=call["id"],
+                                    content=dumps({"error": f"Unknown agent type: {agent_type_str}"})
+                                )
+                                self.conversation_history.append(tool_message)
+                                messages.append(tool_message.to_api())
+                            continue
+                        
+                        # Add tool result to conversation history for handoff context
+                        self.conversation_history.append(ConversationMessage(
+                            role=ROLE_TOOL,
+                            tool_call_id=call["id"],
+                            content=dumps({"handoff_requested": True, "reason": reason})
+                        ))
+                        for extra_call, _ in handoff_calls[1:]:
+                            self.conversation_history.append(ConversationMessage(
+                                role=ROLE_TOOL,
+                                tool_call_id=extra_call["id"],
+                                content=dumps({"error": "Only the first handoff in a turn is acted on"})
+                            ))
+                        
+                        self.request_handoff(
+                            to_agent=target_agent_type,
+                            reason=reason,
+                            context_summary=context_summary,
+                            user_message=message
+                        )
+                        # Handoff happens silently - no message yielded, break from loop
+                        return
                     continue  # ask the model again
                 else:
-                    # No tool calls, yield the final answer
-                    if msg.content:
-                        self.conversation_history.append({"role": "assistant", "content": msg.content})
-                        for word in msg.content.split():
-                            yield word + " "
+                    # No tool calls, the final answer has already been streamed
+                    if content:
+                        self.conversation_history.append(ConversationMessage(role=ROLE_ASSISTANT, content=content))
                         break
             else:
                 # Failsafe: too many tool call loops
                 yield "I'm sorry, I wasn't able to complete your request after several attempts. Please try again or rephrase."
         except Exception as e:
-            print(f"❌ Error in {agent_name} Agent: {e}")
+            logger.error("❌ Error in %s Agent: %s", agent_name, e)
             yield f"I'm sorry, I encountered an error processing your request: {str(e)}"
     
     def handle_tool_call(self, function_name: str, function_args: Dict[str, Any]) -> str:
         """Handle tool calls - to be implemented by subclasses"""
         raise NotImplementedError(f"Agent must implement handle_tool_call for function: {function_name}")
+    
+    async def handle_tool_call_async(self, function_name: str, function_args: Dict[str, Any]) -> str:
+        """Run handle_tool_call in a worker thread so blocking tools don't stall the event loop"""
+        return await asyncio.to_thread(self.handle_tool_call, function_name, function_args)
     def _build_messages(self, message: str, context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        """Build messages array for completion API"""
-        messages = [{"role": "system", "content": self.system_prompt}]
-          # Use conversation history from context (for handoffs) or local history
-        conversation_history = []
-        if context and "conversation_history" in context:
-            # Use coordinator's conversation history for handoffs
-            conversation_history = context["conversation_history"]  # Keep full conversation history
+        """Build messages array for completion API.
+        
+        The system prompt and committed history form a byte-stable prefix so
+        OpenAI's automatic prompt caching can hit; volatile content (handoff
+        context and the current user turn) always goes at the tail.
+        """
+        messages = [{"role": ROLE_SYSTEM, "content": self.system_prompt}]
+        # History entries are projected to API fields only (coordinator entries also carry
+        # "agent"/"timestamp_ns", which would change the prefix bytes) and rendered once each
+        if context and "history_version" in context and self.coordinator:
+            # Handoffs read the coordinator's shared history, up to the version they were handed
+            messages.extend(self.coordinator.conversation_history.rendered(context["history_version"]))
         else:
-            # Use agent's local conversation history
-            conversation_history = self.conversation_history  # Keep full conversation history
-          # Add conversation history to messages
-        for msg in conversation_history:
-            if isinstance(msg, dict) and "role" in msg:
-                # Handle different message types properly
-                if msg["role"] == "assistant" and "tool_calls" in msg:
-                    # Assistant message with tool calls
-                    messages.append({
-                        "role": "assistant",
-                        "content": msg.get("content"),
-                        "tool_calls": msg["tool_calls"]
-                    })
-                elif msg["role"] == "tool":
-                    # Tool result message
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": msg.get("tool_call_id"),
-                        "content": msg.get("content", "")
-                    })
-                elif "content" in msg:
-                    # Regular user/assistant message
-                    messages.append({"role": msg["role"], "content": msg["content"]})
-                # Skip messages without content or tool_calls (invalid messages)
-            
+            # Otherwise use the agent's local conversation history
+            messages.extend(self.conversation_history.rendered())
+        
+        # The history usually already ends with the current user turn; it is re-added at the
+        # tail below, after any handoff context, so drop it here rather than send it twice
+        if len(messages) > 1 and messages[-1].get("role") == ROLE_USER and messages[-1].get("content") == message:
+            messages.pop()
+        
         # Add handoff context if provided, including original request summary and reason
         if context:
             context_summary_parts = []
@@ -309,89 +534,94 @@ class BaseAgent:
                 context_summary_parts.append(f"Previous agent: {context['previous_agent']}")
             if context_summary_parts:
                 context_msg = "\n".join(context_summary_parts)
-                # insert immediately after system prompt for clarity
-                messages.insert(1, {"role": "system", "content": context_msg})
+                # append after the history so it doesn't invalidate the cached prefix
+                messages.append({"role": ROLE_SYSTEM, "content": context_msg})
         
         # Add current user message
-        messages.append({"role": "user", "content": message})
+        messages.append({"role": ROLE_USER, "content": message})
         
         return messages
     
-    def _stream_completion(self, messages: List[Dict[str, Any]]) -> Iterator[str]:
+    async def _stream_completion(self, messages: List[Dict[str, Any]]) -> AsyncIterator[str]:
         """Stream completion from OpenAI"""
         try:
-            stream = self.client.chat.completions.create(
+            stream = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
-                tools=self.tools if self.tools else None,
-                tool_choice="auto" if self.tools else None,
+                **self._tool_kwargs,
                 stream=True,
                 temperature=0.7
             )
             
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
                     
         except Exception as e:
-            print(f"❌ Error in streaming completion: {e}")
+            logger.error("❌ Error in streaming completion: %s", e)
             yield f"I'm sorry, I encountered an error: {str(e)}"
 
 class MultiAgentCoordinator:
     """Coordinates multiple agents and manages handoffs using streaming completion API"""
     
     def __init__(self, coordinator_model: str = "gpt-4o-mini", coordination_mode: CoordinationMode = CoordinationMode.SWARM):
-        self.client = OpenAI(api_key=keys.OPENAI_API_KEY)
+        # One pooled HTTP/2 client shared with every registered agent
+        self.http_client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            transport=httpx.AsyncHTTPTransport(http2=True, limits=HTTP_LIMITS, retries=2),
+        )
+        self.client = AsyncOpenAI(api_key=keys.OPENAI_API_KEY, http_client=self.http_client)
+        # Persistent event loop for synchronous callers; the async client's
+        # connection pool is bound to the loop it was first used on
+        self._loop = asyncio.new_event_loop()
+        # asyncio.to_thread runs on the loop's default executor; size it once up front
+        self._loop.set_default_executor(ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool"))
         self.coordinator_model = coordinator_model  # Allow specifying coordinator model
         self.coordination_mode = coordination_mode  # Mode for coordination behavior
         self.agents: Dict[AgentType, BaseAgent] = {}
+        self.agents_by_name: Dict[str, BaseAgent] = {}  # Same agents keyed by AgentType value
         self.conversation_context = {}
         self.current_agent = AgentType.COORDINATOR
-        self.conversation_history = []
+        self.conversation_history = ConversationLog()
         self.pending_handoff: Optional[HandoffRequest] = None
+        # Incremental routing summary: formatted lines, history entries consumed, lines compacted away
+        self._summary_cache: List[str] = []
+        self._summary_version = 0
+        self._summary_omitted = 0
+        # Normalized opening-message hash -> agent_type; shared by batch sessions since
+        # it holds no conversation-specific text
+        self._route_cache: "OrderedDict[str, str]" = OrderedDict()
         self.coordinator_tools = self._create_coordinator_tools()
         self.coordinator_system_prompt = self._create_coordinator_system_prompt()
         
-        print(f"🎛️ Coordinator initialized in {coordination_mode.value.upper()} mode")    
+        logger.debug("🎛️ Coordinator initialized in %s mode", coordination_mode.value.upper())
     def _create_coordinator_system_prompt(self) -> str:
         """Create the coordinator system prompt based on coordination mode"""
         base_prompt = """
 You are a smart coordinator for a healthcare/pharmacy system with multiple specialized agents.
 
-AVAILABLE AGENTS:
-- PRICING: Drug cost calculations, insurance benefits, pricing estimates
-- AUTHENTICATION: Member verification, login, security checks  
-- PHARMACY: Prescription status, refills, transfers, pickup notifications
-- BENEFITS: Plan details, coverage rules, prior authorizations
-- CLINICAL: Drug interactions, alternatives, clinical criteria
-
-HANDOFF RULES:
-- For prescription refills, status, transfers, pickup → hand off to PHARMACY
-- For authentication, login, verification → hand off to AUTHENTICATION  
-- For drug costs, pricing, insurance → hand off to PRICING
-- For plan details, coverage → hand off to BENEFITS
-- For drug interactions, alternatives → hand off to CLINICAL
+AGENTS (hand off by topic):
+- PRICING: drug costs, pricing estimates, insurance cost calculations
+- AUTHENTICATION: member verification, login, security checks
+- PHARMACY: prescription status, refills, transfers, pickup notifications
+- BENEFITS: plan details, coverage rules, prior authorizations
+- CLINICAL: drug interactions, alternatives, clinical criteria
 """
         
         if self.coordination_mode == CoordinationMode.COORDINATOR:
             mode_specific = """
-COORDINATOR MODE: Your job is to understand user intent and route to the appropriate specialist.
-- Always use the request_handoff function to transfer to the appropriate agent
-- Never respond to the user directly - let the specialists handle responses
-- When an agent completes a task, you'll route follow-up questions to the right agent
-- Agents will return control to you for routing decisions
+COORDINATOR MODE: route every request, including follow-ups; agents return control to you after each task.
 """
         else:  # SWARM mode
             mode_specific = """
-SWARM MODE: Your job is to understand user intent and route to the appropriate specialist for initial requests.
-- Use the request_handoff function for initial routing
-- Never respond to the user directly - let the specialists handle responses  
-- Agents may hand off directly to each other when needed
-- Only route when conversation returns to you or for new initial requests
+SWARM MODE: route initial requests; agents hand off directly to each other, so you only route new requests or when control returns to you.
 """
         
         return base_prompt + mode_specific + """
-IMPORTANT: Never respond to the user directly. Always use request_handoff function immediately to transfer to the appropriate agent. The specialist will handle the actual response.
+IMPORTANT: Never respond to the user directly. Always call request_handoff immediately; the specialist writes the actual response.
 """
     
     def _create_coordinator_tools(self) -> List[Dict[str, Any]]:
@@ -426,26 +656,92 @@ IMPORTANT: Never respond to the user directly. Always use request_handoff functi
     def register_agent(self, agent: BaseAgent):
         """Register a specialized agent"""
         agent.coordinator = self  # Give agent reference to coordinator
+        agent.client = self.client  # Share the coordinator's pooled client
         agent.coordination_mode = self.coordination_mode  # Set agent's coordination mode
         self.agents[agent.agent_type] = agent
-        print(f"🤖 Registered {agent.agent_type.value} agent in {self.coordination_mode.value} mode")
-    def process_message(self, user_message: str) -> Iterator[str]:
+        self.agents_by_name[agent.agent_type.value] = agent
+        logger.debug("🤖 Registered %s agent in %s mode", agent.agent_type.value, self.coordination_mode.value)
+    def process_message_sync(self, user_message: str) -> Iterator[str]:
+        """Synchronous wrapper around process_message for legacy callers"""
+        stream = self.process_message(user_message)
+        try:
+            while True:
+                try:
+                    yield self._loop.run_until_complete(stream.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            self._loop.run_until_complete(stream.aclose())
+    
+    def close(self) -> None:
+        """Release the shared HTTP connection pool, tool workers and the coordinator's event loop"""
+        if self._loop.is_closed():
+            return
+        self._loop.run_until_complete(self.client.close())
+        self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        self._loop.run_until_complete(self._loop.shutdown_default_executor())
+        self._loop.close()
+    
+    def run_batch(self, user_messages: List[str]) -> List[str]:
+        """Synchronous wrapper around process_messages_batch for eval scripts"""
+        return self._loop.run_until_complete(self.process_messages_batch(user_messages))
+    
+    async def process_messages_batch(self, user_messages: List[str]) -> List[str]:
+        """Run independent requests concurrently, each in its own isolated session.
+        
+        Sessions share the pooled client and routing cache but nothing else;
+        responses are returned in the order of ``user_messages``.
+        """
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        
+        async def run_one(user_message: str) -> str:
+            async with semaphore:
+                session = self._new_session()
+                buffer = io.StringIO()
+                async for chunk in session.process_message(user_message):
+                    buffer.write(chunk)
+                return buffer.getvalue()
+        
+        return await asyncio.gather(*(run_one(message) for message in user_messages))
+    
+    def _new_session(self) -> "MultiAgentCoordinator":
+        """Shallow clone with fresh conversation state and its own copies of the agents"""
+        session = copy.copy(self)
+        session.conversation_context = {}
+        session.current_agent = AgentType.COORDINATOR
+        session.conversation_history = ConversationLog()
+        session.pending_handoff = None
+        session._summary_cache = []
+        session._summary_version = 0
+        session._summary_omitted = 0
+        session.agents = {}
+        session.agents_by_name = {}
+        for agent in self.agents.values():
+            agent_copy = copy.copy(agent)
+            agent_copy.conversation_history = ConversationLog()
+            agent_copy.coordinator = session
+            session.agents[agent_copy.agent_type] = agent_copy
+            session.agents_by_name[agent_copy.agent_type.value] = agent_copy
+        return session
+
+    async def process_message(self, user_message: str) -> AsyncIterator[str]:
         """Process user message and coordinate between agents with streaming"""
-        print(f"\n👤 User: {user_message}")
-        print(f"🎛️ Current agent: {self.current_agent.value} (Mode: {self.coordination_mode.value})")
+        logger.debug("👤 User: %s", user_message)
+        logger.debug("🎛️ Current agent: %s (Mode: %s)", self.current_agent.value, self.coordination_mode.value)
         
         # Clear any pending handoffs from previous interactions
         self.pending_handoff = None
         
         # Add to conversation history
-        self.conversation_history.append({
-            "role": "user", 
-            "content": user_message,
-            "timestamp": time.time()
-        })
+        self.conversation_history.append(ConversationMessage(
+            role=ROLE_USER,
+            content=user_message,
+            timestamp_ns=time.monotonic_ns()
+        ))
         
-        # Include conversation history in context
-        self.conversation_context["conversation_history"] = self.conversation_history.copy()
+        # Agents read the shared append-only history in place, up to this version,
+        # instead of receiving a fresh copy every turn
+        self.conversation_context["history_version"] = self.conversation_history.appended
           
         # Handle coordinator mode logic
         if self.coordination_mode == CoordinationMode.COORDINATOR:
@@ -453,80 +749,74 @@ IMPORTANT: Never respond to the user directly. Always use request_handoff functi
             if self.current_agent != AgentType.COORDINATOR and self.current_agent in self.agents:
                 # Check if this is a follow-up question for the same agent
                 current_agent = self.agents[self.current_agent]
-                print(f"🎯 Following up with {self.current_agent.value} agent...")
+                logger.info("🎯 Following up with %s agent...", self.current_agent.value)
                 
-                # Collect the agent's response
-                agent_response_parts = []
-                for chunk in current_agent.process_message(user_message, self.conversation_context):
-                    agent_response_parts.append(chunk)
+                async for chunk in self._stream_agent_response(current_agent, user_message):
                     yield chunk
-                
-                # Add agent's response to coordinator conversation history
-                if agent_response_parts:
-                    full_response = "".join(agent_response_parts).strip()
-                    if full_response:
-                        self.conversation_history.append({
-                            "role": "assistant",
-                            "agent": self.current_agent.value,
-                            "content": full_response,
-                            "timestamp": time.time()
-                        })
                       
                 # In coordinator mode, agents hand back to coordinator
                 if self.pending_handoff:
                     # Process handoff back to coordinator, then route to intended agent
-                    for chunk in self._process_coordinator_mode_handoff(user_message):
+                    async for chunk in self._process_handoff_chain(user_message):
                         yield chunk
                 else:
                     # No handoff requested, stay with current agent or return to coordinator
                     self.current_agent = AgentType.COORDINATOR
-                    print(f"🔄 Returning to coordinator for next routing decision")
+                    logger.info("🔄 Returning to coordinator for next routing decision")
                 return
             else:
                 # Route through coordinator
-                print(f"🎛️ Using coordinator to route message...")
-                for chunk in self._coordinate_request(user_message):
+                logger.info("🎛️ Using coordinator to route message...")
+                async for chunk in self._coordinate_request(user_message):
                     yield chunk
         else:
             # SWARM mode - existing behavior
             # If we're currently with a specialized agent, try them first
             if self.current_agent != AgentType.COORDINATOR and self.current_agent in self.agents:
                 current_agent = self.agents[self.current_agent]
-                print(f"🎯 Continuing conversation with {self.current_agent.value} agent...")
+                logger.info("🎯 Continuing conversation with %s agent...", self.current_agent.value)
                 
-                # Collect the agent's response
-                agent_response_parts = []
-                for chunk in current_agent.process_message(user_message, self.conversation_context):
-                    agent_response_parts.append(chunk)
+                async for chunk in self._stream_agent_response(current_agent, user_message):
                     yield chunk
                 
-                # Add agent's response to coordinator conversation history
-                if agent_response_parts:
-                    full_response = "".join(agent_response_parts).strip()
-                    if full_response:
-                        self.conversation_history.append({
-                            "role": "assistant",
-                            "agent": self.current_agent.value,
-                            "content": full_response,
-                            "timestamp": time.time()
-                        })
-                      # Check for pending handoffs after streaming is complete
+                # Check for pending handoffs after streaming is complete
                 if self.pending_handoff:
                     # Process handoffs recursively to handle chained handoffs
-                    for chunk in self._process_handoff_chain(user_message):
+                    async for chunk in self._process_handoff_chain(user_message):
                         yield chunk
                 return
             
             # Otherwise, use coordinator to determine routing
-            print(f"🎛️ Using coordinator to route message...")
-            for chunk in self._coordinate_request(user_message):
+            logger.info("🎛️ Using coordinator to route message...")
+            async for chunk in self._coordinate_request(user_message):
                 yield chunk
     
-    def _coordinate_request(self, user_message: str) -> Iterator[str]:
+    async def _coordinate_request(self, user_message: str) -> AsyncIterator[str]:
         """Use coordinator to determine which agent should handle the request"""
-        print(f"🎛️ Coordinator analyzing request...")
+        logger.info("🎛️ Coordinator analyzing request...")
         
         try:
+            # Repeated opening messages skip the routing call entirely; later turns depend
+            # on the conversation so far and always go to the model
+            route_key = None
+            if self.conversation_history.appended == 1 and "previous_agent" not in self.conversation_context:
+                route_key = self._route_cache_key(user_message)
+                cached_agent_type = self._route_cache.get(route_key)
+                if cached_agent_type is not None:
+                    self._route_cache.move_to_end(route_key)
+                    logger.info("⚡ Cached routing decision: %s", cached_agent_type)
+                    async for chunk in self._route_to_agent(user_message, cached_agent_type, "Same request as an earlier conversation", user_message):
+                        yield chunk
+                    return
+            
+            # Unambiguous keyword intents skip it as well
+            keyword_route = self._keyword_route(user_message)
+            if keyword_route is not None:
+                logger.info("⚡ Keyword routing decision: %s", keyword_route[0])
+                async for chunk in self._route_to_agent(user_message, *keyword_route):
+                    yield chunk
+                return
+            
             # Create a summary of conversation history for the coordinator
             history_summary = self._create_history_summary()
             
@@ -534,150 +824,188 @@ IMPORTANT: Never respond to the user directly. Always use request_handoff functi
             messages = [
                 {"role": "system", "content": self.coordinator_system_prompt}
             ]
-              # Add conversation history context
-            context_message = f"User request: {user_message}\n\nCurrent context: {json.dumps(self.conversation_context)}\n\nConversation history:\n{history_summary}"
+            # Only the routing-relevant context keys; the history is already summarized above
+            routing_context = {
+                key: self.conversation_context[key]
+                for key in ("previous_agent", "handoff_reason")
+                if key in self.conversation_context
+            }
+            # History first and the new request last, so consecutive turns share a growing prefix
+            context_message = f"Conversation history:\n{history_summary}\n\nCurrent context: {dumps(routing_context)}\n\nUser request: {user_message}"
             messages.append({"role": "user", "content": context_message})
               
             # Try to get completion with tool calls - coordinator MUST use tools
             try:
-                response = self.client.chat.completions.create(
+                response = await self.client.chat.completions.create(
                     model=self.coordinator_model,
                     messages=messages,
                     tools=self.coordinator_tools,
                     tool_choice="required",  # Force tool usage
-                    temperature=0.7
+                    parallel_tool_calls=False,  # Only one handoff is ever acted on
+                    temperature=0.7,
+                    # Route requests sharing the static routing prefix to the same cache shard
+                    extra_body={"prompt_cache_key": f"coordinator-{self.coordination_mode.value}"}
                 )
+                _report_prompt_cache("Coordinator", getattr(response, "usage", None))
                 
                 # Check if there are tool calls (handoffs)
                 if response.choices[0].message.tool_calls:
                     for tool_call in response.choices[0].message.tool_calls:
                         if tool_call.function.name == "request_handoff":
-                            function_args = json.loads(tool_call.function.arguments)
-                            agent_type_str = function_args["agent_type"]
-                            reason = function_args["reason"]
-                            context_summary = function_args["context_summary"]
-                            
-                            print(f"🔄 Handoff requested: {agent_type_str} - {reason}")
-                            
-                            # Update context with handoff info
-                            self.conversation_context["handoff_reason"] = reason
-                            self.conversation_context["context_summary"] = context_summary
-                            self.conversation_context["previous_agent"] = self.current_agent.value                            # Perform handoff
-                            target_agent_type = AgentType(agent_type_str)
-                            if target_agent_type in self.agents:
-                                print(f"🎯 Transferring to {agent_type_str} agent...")
-                                self.current_agent = target_agent_type
-                                target_agent = self.agents[target_agent_type]
-                                
-                                # Collect and stream response from target agent
-                                target_response_parts = []
-                                for chunk in target_agent.process_message(user_message, self.conversation_context):
-                                    target_response_parts.append(chunk)
-                                    yield chunk
-                                
-                                # Add target agent's response to coordinator conversation history
-                                if target_response_parts:
-                                    target_full_response = "".join(target_response_parts).strip()
-                                    if target_full_response:
-                                        self.conversation_history.append({
-                                            "role": "assistant",
-                                            "agent": target_agent_type.value,
-                                            "content": target_full_response,
-                                            "timestamp": time.time()
-                                        })
-                                
-                                # Check for chained handoffs after initial handoff
-                                if self.pending_handoff:
-                                    for chunk in self._process_handoff_chain(user_message):
-                                        yield chunk
-                                return
-                            else:
-                                yield f"I'm sorry, the {agent_type_str} agent is not available right now."
-                                return                
+                            function_args = loads(tool_call.function.arguments)
+                            route = (
+                                function_args["agent_type"],
+                                function_args["reason"],
+                                function_args["context_summary"],
+                            )
+                            if route_key is not None:
+                                self._cache_route(route_key, route[0])
+                            async for chunk in self._route_to_agent(user_message, *route):
+                                yield chunk
+                            return
                 # If no tool calls were made (shouldn't happen with tool_choice="required"), 
                 # fallback to a generic response
                 yield "I'm sorry, I couldn't understand your request. Could you please rephrase it?"
                 return
                         
             except Exception as e:
-                print(f"❌ Error in coordinator completion: {e}")
+                logger.error("❌ Error in coordinator completion: %s", e)
                 yield "I'm sorry, I'm having trouble processing your request right now. Please try again."
         except Exception as e:
-            print(f"❌ Error in coordinator: {e}")
+            logger.error("❌ Error in coordinator: %s", e)
             yield "I'm sorry, I encountered an error while processing your request. Please try again."
     
-    def _handle_agent_response(self, response: AgentResponse) -> str:
-        """Handle response from a specialized agent"""
+    async def _route_to_agent(self, user_message: str, agent_type_str: str, reason: str, context_summary: str) -> AsyncIterator[str]:
+        """Hand the request to the routed agent and stream its response"""
+        logger.info("🔄 Handoff requested: %s - %s", agent_type_str, reason)
+        
+        # Update context with handoff info
+        self.conversation_context["handoff_reason"] = reason
+        self.conversation_context["context_summary"] = context_summary
+        self.conversation_context["previous_agent"] = self.current_agent.value
+        
+        # Perform handoff
+        target_agent = self.agents_by_name.get(agent_type_str)
+        if target_agent is None:
+            yield f"I'm sorry, the {agent_type_str} agent is not available right now."
+            return
+        
+        logger.info("🎯 Transferring to %s agent...", agent_type_str)
+        target_agent_type = target_agent.agent_type
+        self.current_agent = target_agent_type
+        
+        async for chunk in self._stream_agent_response(target_agent, user_message):
+            yield chunk
+        
+        # Check for chained handoffs after initial handoff
+        if self.pending_handoff:
+            async for chunk in self._process_handoff_chain(user_message):
+                yield chunk
+    
+    async def _stream_agent_response(self, agent: BaseAgent, message: str) -> AsyncIterator[str]:
+        """Stream one agent hop and record the full response in the coordinator history"""
+        buffer = io.StringIO()
+        async for chunk in agent.process_message(message, self.conversation_context):
+            buffer.write(chunk)
+            yield chunk
+        
+        full_response = buffer.getvalue().strip()
+        if full_response:
+            self.conversation_history.append(ConversationMessage(
+                role=ROLE_ASSISTANT,
+                agent=agent.agent_type.value,
+                content=full_response,
+                timestamp_ns=time.monotonic_ns()
+            ))
+    
+    def _keyword_route(self, user_message: str) -> Optional[tuple]:
+        """Route without the model when the message's keywords point at exactly one registered agent"""
+        matches = {match.lastgroup: match.group() for match in _ROUTING_PATTERN.finditer(user_message)}
+        if len(matches) != 1:
+            return None
+        agent_type_str, keyword = matches.popitem()
+        if agent_type_str not in self.agents_by_name:
+            return None
+        return (agent_type_str, f"Request mentions '{keyword.lower()}'", user_message)
+    
+    @staticmethod
+    def _route_cache_key(user_message: str) -> str:
+        """Normalized hash of a user message for the routing cache"""
+        normalized = " ".join(user_message.lower().split())
+        return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
+    
+    def _cache_route(self, key: str, agent_type_str: str) -> None:
+        """Remember an opening-turn routing decision, evicting the least recently used beyond the cap"""
+        self._route_cache[key] = agent_type_str
+        self._route_cache.move_to_end(key)
+        if len(self._route_cache) > ROUTE_CACHE_SIZE:
+            self._route_cache.popitem(last=False)
+    
+    async def _handle_agent_response(self, response: AgentResponse, max_handoffs: int = 3) -> str:
+        """Handle a non-streamed response from a specialized agent, following any handoff chain"""
         # Add to conversation history
-        self.conversation_history.append({
-            "role": "assistant",
-            "agent": response.agent_type.value,
-            "content": response.message,
-            "timestamp": time.time()
-        })
+        self.conversation_history.append(ConversationMessage(
+            role=ROLE_ASSISTANT,
+            agent=response.agent_type.value,
+            content=response.message,
+            timestamp_ns=time.monotonic_ns()
+        ))
         
-        # Handle any handoff requests
+        # Handle any handoff requests iteratively through the shared chain loop
         if response.handoff_request:
             handoff = response.handoff_request
-            print(f"🔄 Agent {handoff.from_agent.value} requesting handoff to {handoff.to_agent.value}: {handoff.reason}")
+            logger.info("🔄 Agent %s requesting handoff to %s: %s", handoff.from_agent.value, handoff.to_agent.value, handoff.reason)
             
-            if handoff.to_agent in self.agents:
-                self.current_agent = handoff.to_agent
-                # Merge handoff context with existing context, ensuring history is preserved
-                self.conversation_context.update(handoff.context)
-                self.conversation_context["conversation_history"] = self.conversation_history.copy()
-                self.conversation_context["handoff_chain"] = self.conversation_context.get("handoff_chain", []) + [
-                    {
-                        "from": handoff.from_agent.value,
-                        "to": handoff.to_agent.value,
-                        "reason": handoff.reason,
-                        "timestamp": time.time()
-                    }
-                ]
-                
-                # Process with new agent
-                new_response = self.agents[handoff.to_agent].process_message(
-                    handoff.user_message, self.conversation_context
-                )
-                return self._handle_agent_response(new_response)
-            else:
+            if self._resolve_handoff_target(handoff)[0] is None:
                 # Fall back to coordinator
                 self.current_agent = AgentType.COORDINATOR
                 return f"{response.message}\n\nI'll need to connect you with another specialist, but that service isn't available right now."
+            
+            self.pending_handoff = handoff
+            buffer = io.StringIO()
+            buffer.write(response.message)
+            async for chunk in self._process_handoff_chain(handoff.user_message, max_handoffs):
+                buffer.write(chunk)
+            return buffer.getvalue()
         
         # If agent completed its task, return to coordinator
         if response.completed:
             self.current_agent = AgentType.COORDINATOR
-            print(f"✅ {response.agent_type.value} agent completed task, returning to coordinator")
+            logger.info("✅ %s agent completed task, returning to coordinator", response.agent_type.value)
         
         return response.message
 
     def _add_to_conversation_history(self, role: str, content: str, agent_type: str = None):
         """Add message to conversation history"""
-        entry = {
-            "role": role,
-            "content": content,
-            "timestamp": time.time()
-        }
-        if agent_type:
-            entry["agent"] = agent_type
-        self.conversation_history.append(entry)
-        
-        # Keep all conversation history - no truncation
+        self.conversation_history.append(ConversationMessage(
+            role=role,
+            content=content,
+            agent=agent_type,
+            timestamp_ns=time.monotonic_ns()
+        ))
     
     def _create_history_summary(self) -> str:
-        """Create a formatted summary of conversation history"""
+        """Create a formatted summary of conversation history, formatting only entries added since the last call"""
         if not self.conversation_history:
             return "No previous conversation history."
-        summary_lines = []
-        for entry in self.conversation_history:  # Keep all conversation history
-            if entry["role"] == "user":
-                summary_lines.append(f"User: {entry['content']}")
+        for entry in self.conversation_history.since(self._summary_version):
+            if entry.role == ROLE_USER:
+                self._summary_cache.append(f"User: {entry.content}")
             else:
-                agent_name = entry.get("agent", "Unknown")
-                summary_lines.append(f"{agent_name}: {entry['content']}")
+                agent_name = entry.agent or "Unknown"
+                self._summary_cache.append(f"{agent_name}: {entry.content}")
+        self._summary_version = self.conversation_history.appended
+        
+        # Compact older lines so the routing prompt doesn't grow with every turn
+        overflow = len(self._summary_cache) - MAX_SUMMARY_LINES
+        if overflow > 0:
+            del self._summary_cache[:overflow]
+            self._summary_omitted += overflow
         
-        return "\n".join(summary_lines)
+        summary = "\n".join(self._summary_cache)
+        if self._summary_omitted:
+            summary = f"(... {self._summary_omitted} earlier messages omitted ...)\n{summary}"
+        return summary
     def get_conversation_summary(self) -> Dict[str, Any]:
         """Get summary of conversation state"""
         return {
@@ -685,19 +1013,26 @@ IMPORTANT: Never respond to the user directly. Always use request_handoff functi
             "context": self.conversation_context,
             "history_length": len(self.conversation_history),
             "available_agents": [agent.value for agent in self.agents.keys()],
-            "recent_history": self.conversation_history[-5:] if self.conversation_history else []
+            "recent_history": [
+                {"role": entry.role, "agent": entry.agent, "content": entry.content,
+                 "timestamp": _wall_clock(entry.timestamp_ns) if entry.timestamp_ns else None}
+                for entry in self.conversation_history.since(self.conversation_history.appended - 5)
+            ]
         }
     
     def reset_conversation(self):
         """Reset conversation state but keep agents registered"""
         self.conversation_context = {}
         self.current_agent = AgentType.COORDINATOR
-        self.conversation_history = []
-        print("🔄 Conversation state reset")
+        self.conversation_history = ConversationLog()
+        self._summary_cache = []
+        self._summary_version = 0
+        self._summary_omitted = 0
+        logger.info("🔄 Conversation state reset")
     def switch_to_coordinator(self):
         """Manually switch back to coordinator"""
         self.current_agent = AgentType.COORDINATOR
-        print("🎛️ Switched to coordinator")
+        logger.info("🎛️ Switched to coordinator")
     
     def set_coordination_mode(self, mode: CoordinationMode):
         """Change coordination mode and update all agents"""
@@ -708,67 +1043,17 @@ IMPORTANT: Never respond to the user directly. Always use request_handoff functi
         for agent in self.agents.values():
             agent.coordination_mode = mode
         
-        # Update coordinator prompt for new mode
+        # Update coordinator prompt for new mode; routes chosen under the old prompt no longer apply
         self.coordinator_system_prompt = self._create_coordinator_system_prompt()
+        self._route_cache.clear()
         
-        print(f"🔄 Coordination mode changed from {old_mode.value} to {mode.value}")
-        print(f"📋 All {len(self.agents)} agents updated to {mode.value} mode")
+        logger.info("🔄 Coordination mode changed from %s to %s", old_mode.value, mode.value)
+        logger.info("📋 All %s agents updated to %s mode", len(self.agents), mode.value)
     
     def get_coordination_mode(self) -> CoordinationMode:
         """Get current coordination mode"""
         return self.coordination_mode
-    def _process_coordinator_mode_handoff(self, original_message: str) -> Iterator[str]:
-        """Process handoffs in coordinator mode - route to intended agent"""
-        if not self.pending_handoff:
-            return
-            
-        handoff = self.pending_handoff
-        self.pending_handoff = None
-        
-        # Extract intended agent from context
-        intended_agent_name = handoff.context.get("intended_agent")
-        if not intended_agent_name:
-            print("⚠️ No intended agent found in coordinator mode handoff")
-            yield "\n\nI need to route your request to the appropriate specialist. Let me help you with that."
-            return
-            
-        try:
-            intended_agent_type = AgentType(intended_agent_name)
-        except ValueError:
-            print(f"⚠️ Unknown intended agent: {intended_agent_name}")
-            yield f"\n\nI'm sorry, I couldn't route your request to the {intended_agent_name} specialist."
-            return
-            
-        if intended_agent_type not in self.agents:
-            yield f"\n\nI'm sorry, the {intended_agent_name} specialist is not available right now."
-            return
-            
-        print(f"🔄 Coordinator routing to intended agent: {intended_agent_name}")
-        self.current_agent = intended_agent_type
-        
-        # Update context for the intended agent
-        self.conversation_context.update(handoff.context)
-        self.conversation_context["conversation_history"] = self.conversation_history.copy()
-        
-        # Process with intended agent
-        target_agent = self.agents[intended_agent_type]
-        target_response_parts = []
-        for chunk in target_agent.process_message(handoff.user_message, self.conversation_context):
-            target_response_parts.append(chunk)
-            yield chunk
-        
-        # Add target agent's response to coordinator conversation history
-        if target_response_parts:
-            target_full_response = "".join(target_response_parts).strip()
-            if target_full_response:
-                self.conversation_history.append({
-                    "role": "assistant",
-                    "agent": intended_agent_type.value,
-                    "content": target_full_response,
-                    "timestamp": time.time()
-                })
-    
-    def _process_handoff_chain(self, original_message: str, max_handoffs: int = 3) -> Iterator[str]:
+    async def _process_handoff_chain(self, original_message: str, max_handoffs: int = 3) -> AsyncIterator[str]:
         """Process a chain of handoffs to handle cases where agents hand off to each other"""
         handoff_count = 0
         
@@ -777,39 +1062,58 @@ IMPORTANT: Never respond to the user directly. Always use request_handoff functi
             self.pending_handoff = None  # Clear the handoff
             handoff_count += 1
             
-            print(f"🔄 Processing handoff #{handoff_count} to {handoff.to_agent.value}: {handoff.reason}")
+            logger.info("🔄 Processing handoff #%s to %s: %s", handoff_count, handoff.to_agent.value, handoff.reason)
             
-            # Perform the handoff
-            if handoff.to_agent in self.agents:
-                self.current_agent = handoff.to_agent
-                # Update context with latest conversation history BEFORE handoff
-                self.conversation_context.update(handoff.context)
-                self.conversation_context["conversation_history"] = self.conversation_history.copy()
-                
-                # Continue with the new agent
-                new_agent = self.agents[handoff.to_agent]
-                new_agent_response_parts = []
-                for chunk in new_agent.process_message(handoff.user_message, self.conversation_context):
-                    new_agent_response_parts.append(chunk)
-                    yield chunk
-                
-                # Add new agent's response to coordinator conversation history
-                if new_agent_response_parts:
-                    new_full_response = "".join(new_agent_response_parts).strip()
-                    if new_full_response:
-                        self.conversation_history.append({
-                            "role": "assistant",
-                            "agent": handoff.to_agent.value,
-                            "content": new_full_response,
-                            "timestamp": time.time()
-                        })
-                
-                # Check if this agent also requested a handoff (chained handoff)
-                # Continue the loop to process the next handoff
-            else:
-                yield f"\n\nI'm sorry, the {handoff.to_agent.value} agent is not available right now."
+            target_agent, unavailable_message = self._resolve_handoff_target(handoff)
+            if target_agent is None:
+                yield unavailable_message
                 break
+            
+            # Continue with the new agent; a chained handoff it requests is picked up by the next iteration
+            async for chunk in self._hand_off(handoff, target_agent):
+                yield chunk
         
-        if handoff_count >= max_handoffs:
-            print(f"⚠️ Maximum handoff chain limit ({max_handoffs}) reached")
+        if self.pending_handoff:
+            # Still handing off after the last allowed hop; drop it rather than recurse further
+            self.pending_handoff = None
+            logger.warning("⚠️ Maximum handoff chain limit (%s) reached", max_handoffs)
             yield "\n\nI've transferred your request through multiple specialists. Please let me know if you need further assistance."
+    
+    def _resolve_handoff_target(self, handoff: HandoffRequest) -> tuple:
+        """Agent a handoff lands on, or None and the message to show the user.
+        
+        Handoffs back to the coordinator (coordinator mode) go to their intended agent.
+        """
+        if handoff.to_agent != AgentType.COORDINATOR:
+            target_agent = self.agents_by_name.get(handoff.to_agent.value)
+            if target_agent is None:
+                return None, f"\n\nI'm sorry, the {handoff.to_agent.value} agent is not available right now."
+            return target_agent, ""
+        
+        intended_agent_name = handoff.context.get("intended_agent")
+        if not intended_agent_name:
+            logger.warning("⚠️ No intended agent found in coordinator mode handoff")
+            return None, "\n\nI need to route your request to the appropriate specialist. Let me help you with that."
+        if intended_agent_name not in _AGENT_TYPE_BY_NAME:
+            logger.warning("⚠️ Unknown intended agent: %s", intended_agent_name)
+            return None, f"\n\nI'm sorry, I couldn't route your request to the {intended_agent_name} specialist."
+        target_agent = self.agents_by_name.get(intended_agent_name)
+        if target_agent is None:
+            return None, f"\n\nI'm sorry, the {intended_agent_name} specialist is not available right now."
+        logger.info("🔄 Coordinator routing to intended agent: %s", intended_agent_name)
+        return target_agent, ""
+    
+    async def _hand_off(self, handoff: HandoffRequest, target_agent: BaseAgent) -> AsyncIterator[str]:
+        """Apply a handoff's context, pin the history version and stream the target agent"""
+        self.current_agent = target_agent.agent_type
+        self.conversation_context.update(handoff.context)
+        self.conversation_context["history_version"] = self.conversation_history.appended
+        self.conversation_context.setdefault("handoff_chain", deque(maxlen=MAX_HANDOFF_CHAIN)).append({
+            "from": handoff.from_agent.value,
+            "to": target_agent.agent_type.value,
+            "reason": handoff.reason,
+            "timestamp_ns": time.monotonic_ns()
+        })
+        
+        async for chunk in self._stream_agent_response(target_agent, handoff.user_message):
+            yield chunk
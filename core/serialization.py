@@ -0,0 +1,32 @@
+"""
+JSON helpers for the message hot paths (tool arguments, tool results, context).
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise, so both produce the same compact ``str`` output.
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+if orjson is not None:
+    def dumps(obj: Any) -> str:
+        """Serialize obj to a compact JSON string"""
+        return orjson.dumps(obj, default=str).decode()
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """Parse a JSON string or bytes"""
+        return orjson.loads(data)
+else:
+    def dumps(obj: Any) -> str:
+        """Serialize obj to a compact JSON string"""
+        return json.dumps(obj, default=str, separators=(",", ":"), ensure_ascii=False)
+
+    def loads(data: Union[str, bytes]) -> Any:
+        """Parse a JSON string or bytes"""
+        return json.loads(data)
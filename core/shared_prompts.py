@@ -1,40 +1,37 @@
+from functools import lru_cache
+
 from .agent_coordinator import AgentType, CoordinationMode
 
 
+@lru_cache(maxsize=None)
 def get_shared_context_awareness() -> str:
     """Common context awareness instructions for all agents"""
     return """
 CONTEXT AWARENESS:
-- If context.previous_agent equals your agent name, it means you were already handling this context. You must answer directly and not request a handoff, unless a question is truly outside your expertise.
-- Avoid infinite handoff loops by only handing off when truly outside your expertise.
-- If you need a memberId, handoff to AUTHENTICATION agent first.
-- If you need to verify a member's identity, use the AUTHENTICATION agent.
-
-
-You answer as briefly as possible in small nuggets while providing clear explanations. You do not provide long bullet lists.
-Very Important: You are talking to a human over the phone. Do not overwhelm them with text or long bullet lists. keep answers bite sized. Your answers must be VERY CONCISE. You ask one question at a time, or ask "tell me about" questions if you are trying to whittle down options.
-Be conversational. Don't repeat the same words over and over, like when listing drug options. say 1, 2 or 3 milligrams instead of <drguname> 1 milligram, <drugname> 2 milligram, etc...
+- If context.previous_agent is you, you already own this context: answer directly, no handoff unless truly outside your expertise.
+- Hand off only when truly outside your expertise, to avoid handoff loops.
+- Need a memberId or identity verification → AUTHENTICATION agent first.
 
+STYLE:
+- You are talking to a human over the phone. Keep answers VERY CONCISE and bite sized, with clear explanations.
+- No long bullet lists. Ask one question at a time, or a "tell me about" question to narrow options.
+- Be conversational and don't repeat words: say "1, 2 or 3 milligrams", not "<drugname> 1 milligram, <drugname> 2 milligram".
 """
 
 
+@lru_cache(maxsize=None)
 def get_shared_handoff_rules(agent: AgentType, coordination_mode: CoordinationMode = CoordinationMode.SWARM) -> str:
     """Common and agent-specific handoff rules based on coordination mode"""
     
     if coordination_mode == CoordinationMode.COORDINATOR:
         common_rules = """
 HANDOFF RULES (COORDINATOR MODE):
-- Use request_handoff function ONLY when the request is truly outside your expertise
-- In coordinator mode, you hand control back to the coordinator who will route to the appropriate agent
-- You don't need to specify which agent should handle the request - the coordinator will decide
-- Include detailed context summary so the coordinator can make the best routing decision
-- Focus on your expertise and let the coordinator handle all routing decisions
+- Call request_handoff ONLY when the request is truly outside your expertise; control returns to the coordinator, which picks the next agent.
+- Stay within your expertise and leave all routing to the coordinator.
 """
         # In coordinator mode, agents don't need to know about specific other agents
         specific_rules = """
-- If request is outside your domain → request handoff with detailed context explaining what the user needs
-- Trust the coordinator to route to the right specialist
-- Provide comprehensive context about what the user is asking for
+- Outside your domain → request handoff with a detailed context summary of what the user needs.
 """
     else:  # SWARM mode
         common_rules = """
@@ -13,6 +13,8 @@ Agents:
 - Clinical: Drug interactions and therapeutic alternatives
 """
 
+import logging
+import os
 import sys
 import time
 import signal
@@ -27,9 +29,6 @@ from rich.live import Live
 from rich.layout import Layout
 from rich.columns import Columns
 
-from openai import OpenAI
-import config.keys as keys
-
 # Import all agents
 from core.agent_coordinator import MultiAgentCoordinator, AgentType, CoordinationMode
 from agents.auth_agent import AuthenticationAgent
@@ -44,8 +43,8 @@ class MultiAgentHealthcareApp:
     
     def __init__(self, coordination_mode: CoordinationMode = CoordinationMode.SWARM):
         self.console = Console()
-        self.client = OpenAI(api_key=keys.OPENAI_API_KEY)
         self.coordinator = MultiAgentCoordinator(coordination_mode=coordination_mode)
+        self.client = self.coordinator.client
         self.setup_agents()
         
     def setup_agents(self):
@@ -208,7 +207,7 @@ class MultiAgentHealthcareApp:
                   # Show processing indicator
                 with Live("🤔 Processing...", console=self.console) as live:
                     response_text = ""
-                    for chunk in self.coordinator.process_message(message):
+                    for chunk in self.coordinator.process_message_sync(message):
                         response_text += chunk
                     live.update("✅ Complete!")
                 
@@ -254,7 +253,7 @@ class MultiAgentHealthcareApp:
                   # Process with coordinator
                 with Live("🤔 Processing your request...", console=self.console) as live:
                     response_text = ""
-                    for chunk in self.coordinator.process_message(user_input):
+                    for chunk in self.coordinator.process_message_sync(user_input):
                         response_text += chunk
                         live.update(f"🤔 Processing... {response_text[-20:]}")
                     live.update("✅ Response ready!")
@@ -299,10 +298,20 @@ class MultiAgentHealthcareApp:
         except Exception as e:
             self.console.print(f"\n❌ Application error: {str(e)}", style="bold red")
             sys.exit(1)
+        finally:
+            self.coordinator.close()
 
 
 def main():
     """Application entry point"""
+    # Coordinator and agent traces go through logging; set LOGLEVEL=DEBUG for per-call detail
+    level = getattr(logging, os.environ.get("LOGLEVEL", "INFO").upper(), None)
+    if not isinstance(level, int):
+        level = logging.INFO  # Unknown level names fall back to INFO instead of aborting startup
+    logging.basicConfig(level=level, format="%(message)s")
+    # Keep per-request HTTP client chatter out of the chat transcript
+    for noisy_logger in ("httpx", "httpcore", "openai"):
+        logging.getLogger(noisy_logger).setLevel(logging.WARNING)
     app = MultiAgentHealthcareApp()
     app.run()
 
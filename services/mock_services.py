@@ -1,4 +1,4 @@
-import json
+import logging
 import random
 from typing import List, Dict, Any
 from decimal import Decimal
@@ -11,13 +11,62 @@ from core.models import (
     PlanBenefitStructure, MemberUtilization, FormularyResult,
     DrugCost, CouponResult, Coupon, PricingCalculation
 )
+from core.serialization import loads
 import config.keys as keys
 
+logger = logging.getLogger(__name__)
+
+# Fallback drug table for when the mock NDC service is unavailable, built once at import
+_FALLBACK_NDC_RESULTS = {
+    "metformin": (
+        NDCLookupResult(ndc="00093-7267-01", drug_name="Metformin HCl 500 mg", strength="500 mg", 
+                       dosage_form="tablet", brand_generic="generic", match=0.95),
+        NDCLookupResult(ndc="00093-7268-01", drug_name="Metformin HCl 850 mg", strength="850 mg", 
+                       dosage_form="tablet", brand_generic="generic", match=0.90),
+        NDCLookupResult(ndc="00003-0284-11", drug_name="Glucophage 500 mg", strength="500 mg", 
+                       dosage_form="tablet", brand_generic="brand", match=0.85)
+    ),
+    "lipitor": (
+        NDCLookupResult(ndc="00071-0155-23", drug_name="Lipitor 20 mg", strength="20 mg", 
+                       dosage_form="tablet", brand_generic="brand", match=0.98),
+        NDCLookupResult(ndc="00093-7270-01", drug_name="Atorvastatin 20 mg", strength="20 mg", 
+                       dosage_form="tablet", brand_generic="generic", match=0.85)
+    ),
+    "advair": (
+        NDCLookupResult(ndc="00173-0715-20", drug_name="Advair Diskus 250/50", strength="250/50 mcg", 
+                       dosage_form="inhalation powder", brand_generic="brand", match=0.95),
+    )
+}
+
+_FALLBACK_GENERIC_RESULTS = (
+    NDCLookupResult(ndc="12345-678-90", drug_name="Generic Drug A", strength="10 mg", 
+                    dosage_form="tablet", brand_generic="generic", match=0.6),
+    NDCLookupResult(ndc="12345-678-91", drug_name="Brand Drug B", strength="20 mg", 
+                    dosage_form="capsule", brand_generic="brand", match=0.5)
+)
+
+def _reply_json(response) -> str:
+    """JSON text of a chat completion reply, tolerating empty content and markdown code fences"""
+    choices = response.choices
+    text = ((choices[0].message.content if choices else None) or "").strip()
+    if text.startswith("```"):
+        text = text.split("```", 2)[1]
+        if text.startswith("json"):
+            text = text[4:]
+    return text.strip()
+
 class MockPBMServices:
     """Simplified mock PBM services with only the three core functions"""
     
     def __init__(self):
-        self.client = OpenAI(api_key=keys.OPENAI_API_KEY)
+        self._client = None
+    
+    @property
+    def client(self) -> OpenAI:
+        """OpenAI client, created on first use so idle agents never pay for it"""
+        if self._client is None:
+            self._client = OpenAI(api_key=keys.OPENAI_API_KEY)
+        return self._client
     
     def ndc_lookup(self, query: str, mode: SearchMode = SearchMode.SEARCH) -> NDCLookupResponse:
         """
@@ -55,15 +104,8 @@ class MockPBMServices:
                 temperature=0.3
             )
             
-            response_text = response.choices[0].message.content.strip()
-            
-            # Parse the JSON response
-            if response_text.startswith('```json'):
-                response_text = response_text.split('```json')[1].split('```')[0].strip()
-            elif response_text.startswith('```'):
-                response_text = response_text.split('```')[1].split('```')[0].strip()
-            
-            drugs_data = json.loads(response_text)
+            response_text = _reply_json(response)
+            drugs_data = loads(response_text)
             
             # Convert to our model
             results = []
@@ -89,43 +131,17 @@ class MockPBMServices:
     def _fallback_ndc_lookup(self, query: str, mode: SearchMode) -> NDCLookupResponse:
         """Fallback NDC lookup with realistic mock data"""
         
-        # Mock data based on common queries
-        mock_results = {
-            "metformin": [
-                NDCLookupResult(ndc="00093-7267-01", drug_name="Metformin HCl 500 mg", strength="500 mg", 
-                               dosage_form="tablet", brand_generic="generic", match=0.95),
-                NDCLookupResult(ndc="00093-7268-01", drug_name="Metformin HCl 850 mg", strength="850 mg", 
-                               dosage_form="tablet", brand_generic="generic", match=0.90),
-                NDCLookupResult(ndc="00003-0284-11", drug_name="Glucophage 500 mg", strength="500 mg", 
-                               dosage_form="tablet", brand_generic="brand", match=0.85)
-            ],
-            "lipitor": [
-                NDCLookupResult(ndc="00071-0155-23", drug_name="Lipitor 20 mg", strength="20 mg", 
-                               dosage_form="tablet", brand_generic="brand", match=0.98),
-                NDCLookupResult(ndc="00093-7270-01", drug_name="Atorvastatin 20 mg", strength="20 mg", 
-                               dosage_form="tablet", brand_generic="generic", match=0.85)
-            ],
-            "advair": [
-                NDCLookupResult(ndc="00173-0715-20", drug_name="Advair Diskus 250/50", strength="250/50 mcg", 
-                               dosage_form="inhalation powder", brand_generic="brand", match=0.95)
-            ]
-        }
-        
         # Find best match
         query_lower = query.lower()
         results = []
         
-        for drug_name, drug_results in mock_results.items():
+        for drug_name, drug_results in _FALLBACK_NDC_RESULTS.items():
             if drug_name in query_lower or query_lower in drug_name:
                 results.extend(drug_results)
         
         # If no matches, provide generic examples
         if not results:
-            results = [
-                NDCLookupResult(ndc="12345-678-90", drug_name=f"Generic Drug A", strength="10 mg", 
-                               dosage_form="tablet", brand_generic="generic", match=0.6),
-                NDCLookupResult(ndc="12345-678-91", drug_name=f"Brand Drug B", strength="20 mg", 
-                               dosage_form="capsule", brand_generic="brand", match=0.5)        ]
+            results = list(_FALLBACK_GENERIC_RESULTS)
         
         context = f"Fallback NDC lookup for '{query}' using {mode} mode. Found {len(results)} results."
         return NDCLookupResponse(result=results, context=context)
@@ -206,14 +222,8 @@ class MockPBMServices:
             )
             
             # Parse the OpenAI response
-            openai_response = response.choices[0].message.content.strip()
-              # Clean up the response (remove any markdown formatting)
-            if openai_response.startswith("```json"):
-                openai_response = openai_response[7:]
-            if openai_response.endswith("```"):
-                openai_response = openai_response[:-3]
-            
-            pricing_data = json.loads(openai_response)
+            openai_response = _reply_json(response)
+            pricing_data = loads(openai_response)
             
             # Convert to our model format
             result = RxPriceResult(
@@ -242,14 +252,12 @@ class MockPBMServices:
                 context = pricing_data.get("context", f"Comprehensive price calculated for NDC {ndc} at pharmacy for member {member_id}. Generated using AI-powered pricing engine with full benefit analysis.")
             )
             
-            print("=== OpenAI Pricing Response ===")
-            print(openai_response)  # Debug: print the raw OpenAI response
-            print("=== End OpenAI Pricing Response ===")
+            logger.debug("=== OpenAI Pricing Response ===\n%s\n=== End OpenAI Pricing Response ===", openai_response)
             # Use the context generated by OpenAI, which includes detailed calculation explanation
             
         except Exception as e:
             # Fallback to basic pricing if OpenAI fails
-            print(f"OpenAI pricing generation failed: {e}. Using fallback pricing.")
+            logger.warning("OpenAI pricing generation failed: %s. Using fallback pricing.", e)
             
             # Simulate pricing logic with realistic variations
             base_drug_cost = random.uniform(15.0, 500.0)
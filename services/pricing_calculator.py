@@ -1,41 +1,48 @@
 """
 Mathematical Calculator Tool
 
-This module provides simple mathematical calculation functions that the OpenAI Assistant
-can use to perform reliable step-by-step drug pricing calculations.
+This module provides a safe arithmetic expression evaluator that the pricing agent
+can use to perform reliable drug pricing calculations.
 """
 
-import json
+import ast
+import operator
+
+# Operators and functions an expression may use; anything else is rejected
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+_UNARY_OPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+_FUNCTIONS = {
+    "min": min,
+    "max": max,
+}
 
 class MathCalculator:
     """Simple mathematical calculator for reliable calculations"""
     
-    def add(self, a: float, b: float) -> float:
-        """Add two numbers"""
-        return round(a + b, 2)
-    
-    def subtract(self, a: float, b: float) -> float:
-        """Subtract b from a"""
-        return round(a - b, 2)
-    
-    def multiply(self, a: float, b: float) -> float:
-        """Multiply two numbers"""
-        return round(a * b, 2)
-    
-    def divide(self, a: float, b: float) -> float:
-        """Divide a by b"""
-        if b == 0:
-            raise ValueError("Cannot divide by zero")
-        return round(a / b, 2)
-    
-    def calculate_percentage(self, amount: float, percentage: float) -> float:
-        """Calculate percentage of an amount (e.g., 20% of 100 = 20)"""
-        return round(amount * (percentage / 100), 2)
-    
-    def apply_minimum(self, value: float, minimum: float) -> float:
-        """Return the larger of two values (apply minimum)"""
-        return round(max(value, minimum), 2)
+    def evaluate(self, expression: str) -> float:
+        """Evaluate an arithmetic expression (+ - * /, parentheses, min, max), rounded to cents"""
+        return round(self._evaluate_node(ast.parse(expression, mode="eval").body), 2)
     
-    def apply_maximum(self, value: float, maximum: float) -> float:
-        """Return the smaller of two values (apply maximum/cap)"""
-        return round(min(value, maximum), 2)
+    def _evaluate_node(self, node: ast.AST) -> float:
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return node.value
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+            left = self._evaluate_node(node.left)
+            right = self._evaluate_node(node.right)
+            if isinstance(node.op, ast.Div) and right == 0:
+                raise ValueError("Cannot divide by zero")
+            return _BINARY_OPS[type(node.op)](left, right)
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+            return _UNARY_OPS[type(node.op)](self._evaluate_node(node.operand))
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in _FUNCTIONS and node.args and not node.keywords):
+            return _FUNCTIONS[node.func.id](*(self._evaluate_node(arg) for arg in node.args))
+        raise ValueError(f"Unsupported expression element: {type(getattr(node, 'op', node)).__name__}")